@@ -0,0 +1,112 @@
+"""
+Measure the memory one cached entity costs, comparing models.Snapshot
+objects with the nested dict layout they replaced.
+
+Memory is read as the growth of the process's resident set, in a fresh
+process per measurement, so that whatever the parser leaves behind outside
+the Python heap counts too.
+
+    python benchmarks/bench_memory.py --entities 2000
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import models  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+
+class DictSnapshot:
+    """The previous snapshot layout: a dict per period of metric dicts."""
+
+    def __init__(self, snapshot: models.Snapshot) -> None:
+        self.url = snapshot.url
+        self.description = snapshot.description
+        self.last_updated = snapshot.last_updated
+        self.amounts = {
+            period: {
+                metric: snapshot.amount(metric, period)
+                for metric in snapshot.METRICS
+            }
+            for period in snapshot.PERIODS
+        }
+        self.ranks = {
+            period: {
+                metric: {
+                    column: snapshot.rank(metric, period, column)
+                    for column in snapshot.rank_columns
+                }
+                for metric in snapshot.METRICS
+            }
+            for period in snapshot.PERIODS
+        }
+        self.realm_kills = {
+            period: {
+                column: snapshot.realm_kill(column, period)
+                for column in snapshot.realm_columns
+            }
+            for period in snapshot.PERIODS
+        }
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _retain(build, count: int, results) -> None:
+    gc.collect()
+    before = _rss()
+    entities = [build(index) for index in range(count)]
+    gc.collect()
+    results.put((_rss() - before) / len(entities))
+
+
+def retained_per_entity(build, count: int) -> float:
+    """Resident bytes per entity after building `count` of them, measured
+    in a forked process so earlier measurements don't skew it."""
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_retain, args=(build, count, results))
+    process.start()
+    retained = results.get()
+    process.join()
+    return retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20}{'dict B':>10}{'slots B':>10}{'saved':>10}")
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        # Each entity gets its own URL, as it would in the cache.
+        dicts = retained_per_entity(
+            lambda index: DictSnapshot(
+                models.parse_snapshot(f"{path.stem}/{index}", content)
+            ),
+            args.entities,
+        )
+        slots = retained_per_entity(
+            lambda index: models.parse_snapshot(
+                f"{path.stem}/{index}", content
+            ),
+            args.entities,
+        )
+        print(
+            f"{path.stem:<20}{dicts:>10,.0f}{slots:>10,.0f}"
+            f"{1 - slots / dicts:>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Compare the native lxml parser against the BeautifulSoup parser on the
+synthetic Herald pages in benchmarks/fixtures.
+
+    python benchmarks/bench_parse.py --iterations 200
+"""
+import argparse
+import pathlib
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import models  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+
+def bench(content: bytes, parser: str, iterations: int) -> float:
+    """Return the best mean seconds per parse over three runs."""
+    timer = timeit.Timer(
+        lambda: models.parse_snapshot("fixture", content, parser)
+    )
+    return min(timer.repeat(repeat=3, number=iterations)) / iterations
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument("--iterations", type=int, default=100)
+    args = argument_parser.parse_args()
+
+    print(f"{'fixture':<20}{'soup ms':>10}{'lxml ms':>10}{'speedup':>10}")
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        soup = bench(content, "soup", args.iterations)
+        lxml = bench(content, "lxml", args.iterations)
+        print(
+            f"{path.stem:<20}{soup * 1000:>10.3f}{lxml * 1000:>10.3f}"
+            f"{soup / lxml:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Completely parse the synthetic Herald pages in benchmarks/fixtures
+through a workers.WorkerPool set up inline, with threads and with processes,
+while a ticker measures how long the event loop goes without running. That
+stall is what heartbeats and other commands wait through.
+
+    python benchmarks/bench_pool.py --pages 200 --workers 4
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+import models  # noqa: E402
+import workers  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+TICK = 0.001
+
+
+async def ticker(stalls: list) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        stalls.append(time.perf_counter() - start - TICK)
+
+
+async def bench(content: bytes, pages: int) -> tuple:
+    """Return (pages per second, worst loop stall in seconds)."""
+    # Started before timing, so process start-up isn't counted.
+    await models.PARSE_POOL.run(models.parse_snapshot, "fixture", content)
+
+    stalls = []
+    tick = asyncio.ensure_future(ticker(stalls))
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            models.PARSE_POOL.run(
+                models.parse_snapshot, f"fixture/{page}", content
+            )
+            for page in range(pages)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    # Let the ticker see the end of the last stall.
+    await asyncio.sleep(2 * TICK)
+    tick.cancel()
+    return pages / elapsed, max(stalls, default=0.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=config.PARSE_WORKERS)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20}{'pool':<10}{'pages/s':>10}{'stall ms':>10}")
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        for kind in (None, "thread", "process"):
+            models.PARSE_POOL = workers.WorkerPool(kind, args.workers)
+            rate, stall = asyncio.run(bench(content, args.pages))
+            models.PARSE_POOL.close()
+            print(
+                f"{path.stem:<20}{kind or 'inline':<10}{rate:>10,.0f}"
+                f"{stall * 1000:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Serve the synthetic Herald pages in benchmarks/fixtures from the shared
+snapshot cache in 1, 2, 4, ... processes at once, the way shards serve pages
+one of them fetched, and compare that with parsing the page again.
+
+    python benchmarks/bench_shared.py --reads 2000 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import pathlib
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import models  # noqa: E402
+import shared  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+
+async def populate(path: str, content: bytes) -> None:
+    store = shared.SharedSnapshots(path)
+    snapshot = models.parse_snapshot("fixture", content)
+    store.put("fixture", models.PageVersion(None, None, b"", snapshot))
+    await store.close()
+
+
+async def read(path: str, reads: int) -> None:
+    store = shared.SharedSnapshots(path)
+    for _ in range(reads):
+        await store.get("fixture")
+    await store.close()
+
+
+def reader(path: str, reads: int) -> None:
+    asyncio.run(read(path, reads))
+
+
+def bench(path: str, processes: int, reads: int) -> float:
+    """Return pages read per second across `processes` processes."""
+    workers = [
+        multiprocessing.Process(target=reader, args=(path, reads))
+        for _ in range(processes)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return processes * reads / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20}{'source':<14}{'pages/s':>10}")
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        start = time.perf_counter()
+        for _ in range(100):
+            models.parse_snapshot("fixture", content)
+        rate = 100 / (time.perf_counter() - start)
+        print(f"{path.stem:<20}{'parse':<14}{rate:>10,.0f}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = f"{directory}/snapshots.db"
+            asyncio.run(populate(database, content))
+            processes = 1
+            while processes <= args.processes:
+                rate = bench(database, processes, args.reads)
+                source = f"shared x{processes}"
+                print(f"{path.stem:<20}{source:<14}{rate:>10,.0f}")
+                processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Time a cold `import harold` in fresh interpreters and measure the memory it
+leaves behind, against the start-up budget. Also checks that the modules
+that are meant to load on first use haven't been pulled in by the import,
+and that importing touched no files.
+
+Exits non-zero when over budget, so it can gate a container build.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Median wall time of `import harold`, and peak RSS right after it.
+BUDGET_MS = 300
+BUDGET_RSS_MB = 55
+
+# Heavy modules harold only needs once a command or a page asks for them.
+LAZY_MODULES = ("numpy", "bs4", "mypy")
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import harold
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_once(cwd: str, bytecode: bool = False) -> dict:
+    """Import harold in a fresh interpreter. Only with `bytecode` may it
+    write __pycache__, so measured runs leave the tree as they found it."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    if bytecode:
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+    else:
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        # One unmeasured run, so every measured one finds bytecode compiled.
+        run_once(cwd, bytecode=True)
+        results = [run_once(cwd) for _ in range(args.runs)]
+        touched = sorted(path.name for path in pathlib.Path(cwd).iterdir())
+
+    times = [result["ms"] for result in results]
+    rss = max(result["rss_mb"] for result in results)
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    median = statistics.median(times)
+
+    print(f"{'import ms (median)':<24}{median:>10.1f}{BUDGET_MS:>10}")
+    print(f"{'import ms (max)':<24}{max(times):>10.1f}")
+    print(f"{'peak rss MB':<24}{rss:>10.1f}{BUDGET_RSS_MB:>10}")
+    print(f"{'loaded eagerly':<24}{', '.join(loaded) or '-':>10}")
+    print(f"{'files created':<24}{', '.join(touched) or '-':>10}")
+
+    if median > BUDGET_MS or rss > BUDGET_RSS_MB or loaded or touched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
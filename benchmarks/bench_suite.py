@@ -0,0 +1,114 @@
+"""
+Offline benchmark of the command hot path, stage by stage, on the synthetic
+Herald pages in benchmarks/fixtures. Nothing is fetched.
+
+    parse   :: models.parse_snapshot
+    project :: every model view and callback in callbacks/*
+    embed   :: messages.build_stats_embed for every projection
+
+Each stage reports throughput and the peak Python heap allocated by one run,
+as seen by tracemalloc (lxml's own C allocations are not traced).
+
+    python benchmarks/bench_suite.py --iterations 200 --stage parse
+"""
+import argparse
+import pathlib
+import sys
+import time
+import tracemalloc
+
+from typing import Callable, Dict, List, Tuple
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import messages  # noqa: E402
+import models  # noqa: E402
+
+from callbacks import rank_realm, rank_server, realm_kills, stats  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+PROJECTIONS = (
+    [(models.GetAmounts, callback) for callback in stats.CALLBACK_MAP.values()]
+    + [
+        (models.GetRanks, callback)
+        for callback in rank_server.CALLBACK_MAP.values()
+    ]
+    + [
+        (models.GetRanks, callback)
+        for callback in rank_realm.CALLBACK_MAP.values()
+    ]
+    + [
+        (models.GetRealmKills, callback)
+        for callback in realm_kills.CALLBACK_MAP.values()
+    ]
+)
+
+
+def load_fixtures() -> Dict[str, bytes]:
+    return {
+        path.stem: path.read_bytes()
+        for path in sorted(FIXTURES.glob("*.html"))
+    }
+
+
+def project(snapshot: models.Snapshot) -> List[dict]:
+    return [model(callback).view(snapshot) for model, callback in PROJECTIONS]
+
+
+def build_embeds(responses: List[dict]) -> list:
+    return [messages.build_stats_embed(response) for response in responses]
+
+
+def stages(content: bytes) -> Dict[str, Callable[[], object]]:
+    snapshot = models.parse_snapshot("fixture", content)
+    responses = project(snapshot)
+    return {
+        "parse": lambda: models.parse_snapshot("fixture", content),
+        "project": lambda: project(snapshot),
+        "embed": lambda: build_embeds(responses),
+    }
+
+
+def measure(func: Callable[[], object], iterations: int) -> Tuple[float, int]:
+    """Return (seconds per run, peak bytes allocated by one run)."""
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument(
+        "--stage", action="append", choices=("parse", "project", "embed")
+    )
+    args = parser.parse_args()
+    selected = args.stage or ("parse", "project", "embed")
+
+    print(
+        f"{'fixture':<20}{'stage':<10}{'ops/s':>12}{'us/op':>12}"
+        f"{'peak KiB':>12}"
+    )
+    for name, content in load_fixtures().items():
+        for stage, func in stages(content).items():
+            if stage not in selected:
+                continue
+            elapsed, peak = measure(func, args.iterations)
+            print(
+                f"{name:<20}{stage:<10}{1 / elapsed:>12,.0f}"
+                f"{elapsed * 1e6:>12.1f}{peak / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Check leaderboard.parse_ladder against the Herald ranking pages recorded in
+benchmarks/fixtures/ladders, and with --record, record the first page of a
+ladder from the live Herald first.
+
+The crawler (config.LEADERBOARD_ENABLED) should only be switched on once
+this passes on a freshly recorded page: every recorded page must parse into
+rows, best amount first.
+
+    python benchmarks/check_ladder.py --record --entity c --metric rps
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+import leaderboard  # noqa: E402
+import models  # noqa: E402
+
+LADDERS = ROOT / "benchmarks" / "fixtures" / "ladders"
+
+
+async def record(entity: str, metric: str, window: str) -> pathlib.Path:
+    url = config.LEADERBOARD_URL.format(
+        entity=entity,
+        metric=config.LEADERBOARD_METRICS[metric],
+        window=config.LEADERBOARD_WINDOWS[window],
+        page=1,
+    )
+    try:
+        response = await models.fetch(url)
+    finally:
+        await models.close_session()
+    if isinstance(response, str):
+        sys.exit(f"Couldn't load {url}: {response}")
+    if not response.ok:
+        sys.exit(f"Couldn't load {url}: HTTP {response.status_code}")
+    if response.url == config.FAILED_RESPONSE_REDIRECT:
+        sys.exit(f"{url} redirects to the Herald's front page")
+
+    LADDERS.mkdir(parents=True, exist_ok=True)
+    path = LADDERS / f"{entity}_{metric}_{window}.html"
+    path.write_bytes(response.content)
+    return path
+
+
+def check(path: pathlib.Path) -> bool:
+    entries = leaderboard.parse_ladder(path.read_bytes())
+    amounts = [amount for _, amount in entries]
+    ok = bool(entries) and amounts == sorted(amounts, reverse=True)
+    print(f"{path.name:<32}{len(entries):>6} rows  {'ok' if ok else 'FAILED'}")
+    for name, amount in entries[:3]:
+        print(f"    {name:<28}{amount:>14,}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--entity", choices=("c", "g"), default="c")
+    parser.add_argument(
+        "--metric", choices=config.LEADERBOARD_METRICS, default="rps"
+    )
+    parser.add_argument(
+        "--window", choices=config.LEADERBOARD_WINDOWS, default="week"
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        path = asyncio.run(record(args.entity, args.metric, args.window))
+        print(f"Recorded {path}")
+
+    paths = sorted(LADDERS.glob("*.html"))
+    if not paths:
+        sys.exit(f"No ladder pages recorded in {LADDERS}")
+    results = [check(path) for path in paths]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check models.parse_members against the Herald guild pages recorded in
+benchmarks/fixtures/rosters, and with --record, record the page of a guild
+from the live Herald first.
+
+?roster (config.ROSTER_ENABLED) should only be switched on once this passes
+on a freshly recorded page: every recorded page must list members, and the
+statistics on it must still parse.
+
+    python benchmarks/check_roster.py --record 'Swipe Right'
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+import models  # noqa: E402
+
+ROSTERS = ROOT / "benchmarks" / "fixtures" / "rosters"
+
+
+async def record(guild: str) -> pathlib.Path:
+    url = models.entity_url("g", guild)
+    try:
+        response = await models.fetch(url)
+    finally:
+        await models.close_session()
+    if isinstance(response, str):
+        sys.exit(f"Couldn't load {url}: {response}")
+    if not response.ok:
+        sys.exit(f"Couldn't load {url}: HTTP {response.status_code}")
+    if response.url == config.FAILED_RESPONSE_REDIRECT:
+        sys.exit(f"{url} redirects to the Herald's front page")
+
+    ROSTERS.mkdir(parents=True, exist_ok=True)
+    path = ROSTERS / f"{guild.lower().replace(' ', '_')}.html"
+    path.write_bytes(response.content)
+    return path
+
+
+def check(path: pathlib.Path) -> bool:
+    content = path.read_bytes()
+    members = models.parse_members(content)
+    try:
+        models.parse_snapshot(path.name, content)
+    except (IndexError, ValueError):
+        parsed = False
+    else:
+        parsed = True
+    ok = bool(members) and parsed
+    status = "ok" if ok else "FAILED"
+    print(f"{path.name:<32}{len(members):>6} members  {status}")
+    for name in members[:3]:
+        print(f"    {name}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--record", metavar="GUILD")
+    args = parser.parse_args()
+
+    if args.record:
+        path = asyncio.run(record(args.record))
+        print(f"Recorded {path}")
+
+    paths = sorted(ROSTERS.glob("*.html"))
+    if not paths:
+        sys.exit(f"No guild pages recorded in {ROSTERS}")
+    results = [check(path) for path in paths]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
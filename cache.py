@@ -0,0 +1,97 @@
+"""
+Bounded in-process caches that sit in front of the Herald.
+"""
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class TTLCache:
+    """A mapping whose entries expire `ttl` seconds after they were stored and
+    that evicts the least recently used entry once it holds `maxsize` items.
+
+    Example:
+
+    cache = TTLCache(maxsize=256, ttl=60)
+    cache.set("https://herald.playphoenix.online/c/debug/", snapshot)
+    cache.get("https://herald.playphoenix.online/c/debug/")
+
+    Functions in `eviction_listeners` are called with (key, value) whenever
+    an entry leaves the cache because it expired, was evicted, popped or
+    cleared. Overwriting a key with `set` doesn't count as leaving.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.eviction_listeners: List[Callable[[Hashable, Any], None]] = []
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the live value stored under `key`, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires, value = entry
+        if expires <= self.clock():
+            del self._entries[key]
+            self._evicted(key, value)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting the oldest entries if full."""
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, (_, old) = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._evicted(evicted, old)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._evicted(key, entry[1])
+        return entry[1]
+
+    def clear(self) -> None:
+        entries, self._entries = self._entries, OrderedDict()
+        for key, (_, value) in entries.items():
+            self._evicted(key, value)
+
+    def _evicted(self, key: Hashable, value: Any) -> None:
+        for listener in self.eviction_listeners:
+            listener(key, value)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,162 @@
+"""
+The metric engine behind every callback. Snapshots are read as NumPy
+entity x metric x period matrices, and everything the bot shows is a view
+over those.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Sequence
+
+# NumPy is imported where it's used, so that it loads with the first command
+# rather than with the bot.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _ratio(numerator, denominator, otherwise):
+    """`numerator / denominator`, or `otherwise` where the denominator is 0."""
+    import numpy as np
+
+    out = np.empty(numerator.shape, dtype=np.float64)
+    out[...] = otherwise
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+class Frame:
+    """The amounts of one or many snapshots as an N x metric x period int64
+    matrix, and the ratios derived from it, all computed in one pass.
+
+    A single snapshot's array is wrapped without copying.
+
+    Example:
+
+    frame = Frame([debug, swipe_right])
+    frame.amount("Kills")  # N x period
+    frame.derived["kd"]  # N x period
+    """
+
+    def __init__(self, snapshots: Iterable) -> None:
+        import numpy as np
+
+        self.snapshots = list(snapshots)
+        first = self.snapshots[0]
+        self.metrics = first.METRICS
+        if len(self.snapshots) == 1:
+            buffer = first.amounts
+        else:
+            buffer = b"".join(
+                snapshot.amounts.tobytes() for snapshot in self.snapshots
+            )
+        self.amounts = np.frombuffer(buffer, dtype=np.int64).reshape(
+            len(self.snapshots), len(self.metrics), len(first.PERIODS)
+        )
+
+        self._derived = None
+
+    def __len__(self) -> int:
+        return len(self.snapshots)
+
+    @property
+    def derived(self) -> Dict[str, "np.ndarray"]:
+        """Every ratio at once, worked out the first time one is asked for."""
+        if self._derived is None:
+            import numpy as np
+
+            rps = self.amount("Realm Points")
+            deaths = self.amount("Deaths")
+            kills = self.amount("Kills")
+            solos = self.amount("Solo Kills")
+            self._derived = {
+                # int() of the float quotient, as ?character irs always did.
+                "irs": _ratio(rps, deaths, rps).astype(np.int64),
+                "kd": _ratio(kills, deaths, kills),
+                "solo%": 100 * _ratio(solos, kills, 0),
+                "rpk": _ratio(rps, kills, rps),
+            }
+        return self._derived
+
+    def amount(self, metric: str) -> "np.ndarray":
+        return self.amounts[:, self.metrics.index(metric)]
+
+    def rank(self, metric: str, column: str) -> List[list]:
+        """Ranks in `column`, None for snapshots without that column. Rank
+        columns differ between pages, so these are looked up one by one."""
+        return [
+            [
+                snapshot.rank(metric, period, column)
+                for period in snapshot.PERIODS
+            ]
+            for snapshot in self.snapshots
+        ]
+
+    def realm_kill(self, column: str) -> List[list]:
+        """Kills in the realm `column`. Pages leave out the entity's own
+        realm, so a missing column is 0."""
+        return [
+            [
+                snapshot.realm_kill(column, period)
+                for period in snapshot.PERIODS
+            ]
+            for snapshot in self.snapshots
+        ]
+
+
+class View:
+    """One thing the bot can show about an entity, e.g. its kills or its
+    realm rank in deaths. Calling a view with a snapshot gives the response
+    an embed is built from, like the callback functions it replaces;
+    `project` does the same for a whole `Frame`.
+
+    Arguments:
+    description :: str
+        The embed description.
+    values :: Frame -> N x period
+        Picks the view's values out of a frame.
+    formatter :: value -> value
+        Applied to every value, e.g. to round ratios.
+
+    Example:
+
+    kills = View("Kills", lambda frame: frame.amount("Kills"))
+    kills(snapshot)  # {"All Time": 1714, ..., "Embed Description": "Kills"}
+    kills.project(Frame(snapshots))  # one response per snapshot
+    """
+
+    def __init__(
+        self,
+        description: str,
+        values: Callable[[Frame], Sequence],
+        formatter: Callable = None,
+    ) -> None:
+        self.description = description
+        self.values = values
+        self.formatter = formatter
+
+    def __call__(self, snapshot) -> dict:
+        return self.project(Frame([snapshot]))[0]
+
+    def project(self, frame: Frame) -> List[dict]:
+        responses = []
+        for snapshot, row in zip(frame.snapshots, self.values(frame)):
+            row = row.tolist() if hasattr(row, "tolist") else row
+            if self.formatter:
+                row = [self.formatter(value) for value in row]
+            response = dict(zip(snapshot.PERIODS, row))
+            response.update(snapshot.header())
+            response["Embed Description"] = self.description
+            responses.append(response)
+        return responses
+
+
+def amount(metric: str, description: str) -> View:
+    return View(description, lambda frame: frame.amount(metric))
+
+
+def derived(name: str, description: str, formatter: Callable = None) -> View:
+    return View(description, lambda frame: frame.derived[name], formatter)
+
+
+def rank(metric: str, column: str, description: str) -> View:
+    return View(description, lambda frame: frame.rank(metric, column))
+
+
+def realm_kill(column: str, description: str) -> View:
+    return View(description, lambda frame: frame.realm_kill(column))
@@ -1,127 +1,18 @@
 """
-Callback functions to be passed to the models callables. (Refactor into decorator pattern.)
+Amounts and the ratios derived from them, as views of the metric engine.
+Each one projects a `models.Snapshot` into the response an embed is built
+from.
 """
-import functools
-
-
-def get_realm_points_per_death(response: dict) -> dict:
-    """Calculate the I.R.S. for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        realm_points = value.get("Realm Points")
-        deaths = value.get("Deaths")
-
-        if deaths == 0:
-            resp.update({key: int(realm_points)})
-        else:
-            resp.update({key: int(float(realm_points) / float(deaths))})
-
-    resp.update({"Embed Description": "I Remain Standing"})
-
-    return resp
-
-
-def get_realm_points(response: dict) -> dict:
-    """Get realm points for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        realm_points = value.get("Realm Points")
-        resp.update({key: int(realm_points)})
-
-    resp.update({"Embed Description": "Realm Points"})
-
-    return resp
-
-
-def get_deaths(response: dict) -> dict:
-    """Get deaths for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        deaths = value.get("Deaths")
-        resp.update({key: int(deaths)})
-
-    resp.update({"Embed Description": "Death"})
-
-    return resp
-
-
-def get_deathblows(response: dict) -> dict:
-    """Get deathblows for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        deathblows = value.get("Deathblows")
-        resp.update({key: int(deathblows)})
-
-    resp.update({"Embed Description": "Deathblows"})
-
-    return resp
-
-
-def get_kills(response: dict) -> dict:
-    """Get kills for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        kills = value.get("Kills")
-        resp.update({key: int(kills)})
-
-    resp.update({"Embed Description": "Kills"})
-
-    return resp
-
-
-def get_solo_kills(response: dict) -> dict:
-    """Calculate solo kills for a particular guild or character."""
-    resp = {}
-
-    for key, value in response.items():
-
-        if key in ("Last Updated", "Description", "URL"):
-            resp.update({key: value})
-            continue
-
-        solo_kills = value.get("Solo Kills")
-        resp.update({key: int(solo_kills)})
-
-    resp.update({"Embed Description": "Solo Kills"})
-
-    return resp
-
+from callbacks import engine
 
 CALLBACK_MAP = {
-    "rps": get_realm_points,
-    "deathblows": get_deathblows,
-    "deaths": get_deaths,
-    "kills": get_kills,
-    "solos": get_solo_kills,
-    "irs": get_realm_points_per_death,
+    "rps": engine.amount("Realm Points", "Realm Points"),
+    "deathblows": engine.amount("Deathblows", "Deathblows"),
+    "deaths": engine.amount("Deaths", "Death"),
+    "kills": engine.amount("Kills", "Kills"),
+    "solos": engine.amount("Solo Kills", "Solo Kills"),
+    "irs": engine.derived("irs", "I Remain Standing"),
+    "kd": engine.derived("kd", "Kills per Death", "{:.2f}".format),
+    "solo%": engine.derived("solo%", "Solo Kills (%)", "{:.1f}".format),
+    "rpk": engine.derived("rpk", "Realm Points per Kill", "{:,.0f}".format),
 }
@@ -1,6 +1,19 @@
 """
 Configuration related variables and objects.
 """
+import os
+
+# The bot runs as SHARD_COUNT processes, started by shards.py, each
+# connected to Discord as shard SHARD_ID. The pages they parse are shared
+# through SHARED_CACHE_DB, a SQLite database in WAL mode; waits for its lock
+# are in seconds. Jobs that crawl the Herald on their own, the ladder crawl
+# and the hot-entity prefetch, run on shard 0 only.
+SHARD_ID = int(os.environ.get("HAROLD_SHARD_ID", 0))
+SHARD_COUNT = int(os.environ.get("HAROLD_SHARD_COUNT", 1))
+SHARED_CACHE_DB = "data/snapshots.db"
+SHARED_CACHE_TIMEOUT = 5
+SHARED_CACHE_PRUNE_EVERY = 500
+
 TABLES = (
     "rps",
     "deathblows",
@@ -26,7 +39,141 @@ SUPPORTED_TABLE_COMMANDS = (
     "kills",
     "solos",
     "irs",
+    "kd",
+    "solo%",
+    "rpk",
 )
 
+# An embed holds at most 25 fields; one field is used per compared entity.
+COMPARE_MAX_ENTITIES = 10
+
+# Snapshot history for ?history, written in batches off the event loop.
+HISTORY_DB = "data/history.db"
+HISTORY_BATCH_SIZE = 50
+HISTORY_FLUSH_INTERVAL = 5
+
+# Hot entities are re-fetched PREFETCH_DELAY seconds after each expected
+# Herald update. Intervals are in seconds.
+PREFETCH_TOP = 50
+PREFETCH_TRACKED = 2000
+# Once PREFETCH_TRACKED entities are counted, the PREFETCH_TRIM least
+# queried are forgotten at once, oldest first, so a new entity doesn't
+# cost a pass over every count.
+PREFETCH_TRIM = 200
+PREFETCH_CONCURRENCY = 5
+PREFETCH_DELAY = 30
+PREFETCH_RETRIES = 3
+PREFETCH_DEFAULT_INTERVAL = 3600
+PREFETCH_MIN_INTERVAL = 60
+PREFETCH_UPDATE_HISTORY = 16
+# Shards other than 0 hand their query counts to its prefetcher this often.
+PREFETCH_REPORT_INTERVAL = 60
+
 FAILED_RESPONSE_REDIRECT = "https://herald.playphoenix.online/"
+
+# Outbound Herald connection pool. Timeouts are in seconds.
+HERALD_POOL_SIZE = 20
+HERALD_KEEPALIVE = 30
+HERALD_TIMEOUT = 10
+
+# Adaptive cap on concurrent Herald requests. It grows while responses are
+# faster than the target latency and is cut by the backoff factor on 429s,
+# 5xxs and failures, at most once per cooldown. Shards split the ceiling,
+# so together they never have more requests in flight than one process.
+HERALD_LIMIT_MIN = 1
+HERALD_LIMIT_MAX = max(HERALD_LIMIT_MIN, HERALD_POOL_SIZE // SHARD_COUNT)
+HERALD_LIMIT_INITIAL = min(4, HERALD_LIMIT_MAX)
+HERALD_LIMIT_TARGET_LATENCY = 2.0
+HERALD_LIMIT_BACKOFF = 0.5
+HERALD_LIMIT_COOLDOWN = 2.0
+
+# "lxml" parses natively from bytes; "soup" goes through BeautifulSoup.
+HERALD_PARSER = "lxml"
+
+# Pages are parsed on PARSE_WORKERS worker "process"es or "thread"s, or on
+# the event loop itself when PARSE_POOL is None. At most PARSE_QUEUE pages
+# wait for or sit in the pool; further fetches wait before handing theirs
+# over. The cores are split between the shards.
+#
+# Both pools keep a large guild page from stalling the loop for a second.
+# Threads share the GIL with the loop, though, so only processes parse on
+# several cores at once. That is worth pickling every snapshot back, which
+# on a single core halves pages per second compared with parsing inline
+# (see benchmarks/bench_pool.py). harold.py forks the worker processes
+# before the bot connects, so they don't inherit its sockets and threads.
+PARSE_POOL = "process"
+PARSE_WORKERS = max(1, (os.cpu_count() or 1) // SHARD_COUNT)
+PARSE_QUEUE = 32
+
+# Parsed Herald pages are reused for CACHE_TTL seconds.
+CACHE_MAX_ENTRIES = 512
+CACHE_TTL = 120
+
+# Unknown characters and guilds are remembered for MISSING_TTL seconds.
+MISSING_MAX_ENTRIES = 4096
+MISSING_TTL = 300
+
+# Validators and body hashes of pages we've parsed, kept after the snapshot
+# cache lets them go so expired pages can be revalidated instead of reparsed.
+REVALIDATE_MAX_ENTRIES = 2048
+REVALIDATE_TTL = 6 * 3600
+
+# ?roster fetches at most ROSTER_MAX_MEMBERS member pages of a guild,
+# ROSTER_CONCURRENCY at a time, and lists the top ROSTER_TOP_MAX. The rest
+# of the embed's 25 fields hold the per-metric summary.
+# The roster markup (PageMetadata.xpath_roster) hasn't been checked against
+# a page recorded from the Herald yet. Keep ?roster off until
+# `python benchmarks/check_roster.py --record <guild>` parses one correctly.
+ROSTER_ENABLED = False
+ROSTER_MAX_MEMBERS = 250
+ROSTER_CONCURRENCY = 10
+ROSTER_TOP_MAX = 15
+
+# ?watch re-fetches every watched entity once per WATCH_INTERVAL seconds.
+WATCH_INTERVAL = 300
+WATCH_CONCURRENCY = 5
+WATCH_MAX_PER_CHANNEL = 25
+
+# Embeds built from cached snapshots, reused until the Herald updates.
+EMBED_CACHE_MAX_ENTRIES = 1024
+# Ranking pages crawled into the local leaderboard index. The URL is
+# formatted with entity ("c" or "g"), metric and window slugs and a 1-based
+# page number.
+LEADERBOARD_URL = (
+    "https://herald.playphoenix.online/ladder/{entity}/{metric}/{window}/{page}/"
+)
+LEADERBOARD_METRICS = {
+    "rps": "realm-points",
+    "deathblows": "deathblows",
+    "deaths": "deaths",
+    "kills": "kills",
+    "solos": "solo-kills",
+}
+LEADERBOARD_WINDOWS = {
+    "all": "all-time",
+    "week": "this-week",
+    "lastweek": "last-week",
+    "48h": "last-48-hours",
+}
+LEADERBOARD_PAGES = 5
+# The ladder URL scheme and row markup above haven't been checked against a
+# page recorded from the Herald yet. Keep the crawler off until
+# `python benchmarks/check_ladder.py --record` parses one correctly.
+LEADERBOARD_ENABLED = False
+# Shards other than 0 pick up its crawls from the shared cache this often.
+LEADERBOARD_FOLLOW_INTERVAL = 60
+LEADERBOARD_REFRESH = 3600
+LEADERBOARD_TOP_MAX = 20
+
+# Name index used for typo correction and "did you mean" suggestions.
+NAMES_MAX = 50000
+NAMES_CANDIDATES = 25
+NAMES_SUGGESTIONS = 3
+NAMES_SUGGEST_RATIO = 0.75
+
+# Prometheus-style metrics are served on http://METRICS_HOST:METRICS_PORT/metrics,
+# one port per shard.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108 + SHARD_ID
+
 TOKEN = ""
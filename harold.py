@@ -1,37 +1,53 @@
 """
 Harold -- An asynchronous Discord bot that parses HTML from https://herald.playphoenix.online/.
 """
+import asyncio
 import logging
+import os
 import sys
-import urllib
+import time
 
-import bs4
 import discord
-import requests
 
 import config
+import history
+import leaderboard
 import messages
+import metrics
 import models
+import names
+import prefetch
+import roster
+import shared
+import watch
 
-from callbacks import stats, rank_server, rank_realm, realm_kills
+from callbacks import engine, stats, rank_server, rank_realm, realm_kills
 
 from discord.ext import commands
 
 logger = logging.getLogger("discord")
 logger.setLevel(logging.DEBUG)
+harold_logger = logging.getLogger("harold")
+harold_logger.setLevel(logging.DEBUG)
 
-stream_handler = logging.StreamHandler(sys.stdout)
-file_handler = logging.FileHandler(
-    filename="log/discord.log", encoding="utf-8", mode="w"
-)
-stream_handler.setFormatter(
-    logging.Formatter("harold:%(asctime)s:%(name)s: %(message)s")
-)
-file_handler.setFormatter(
-    logging.Formatter("harold:%(asctime)s:%(name)s: %(message)s")
-)
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+
+def setup_logging(path="log/discord.log"):
+    """Log to stdout and to `path`, which is truncated. Done when the bot
+    runs rather than on import, so importing harold touches no files."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = logging.FileHandler(
+        filename=path, encoding="utf-8", mode="w"
+    )
+    stream_handler.setFormatter(
+        logging.Formatter("harold:%(asctime)s:%(name)s: %(message)s")
+    )
+    file_handler.setFormatter(
+        logging.Formatter("harold:%(asctime)s:%(name)s: %(message)s")
+    )
+    for handled_logger in (logger, harold_logger):
+        handled_logger.addHandler(file_handler)
+        handled_logger.addHandler(stream_handler)
 
 
 description = """
@@ -46,17 +62,232 @@ description = """
 Get player and guild statistics, ranks and realm kills from https://herald.playphoenix.online/.
 
 """
-HAROLD = commands.Bot(command_prefix="?", description=description)
+
+
+HISTORY = history.HistoryStore(config.HISTORY_DB)
+models.SNAPSHOT_LISTENERS.append(HISTORY.record)
+
+LEADERBOARD = leaderboard.LeaderboardIndex()
+
+NAMES = names.NameIndex()
+models.SNAPSHOT_LISTENERS.append(NAMES.observe)
+LEADERBOARD.listeners.append(
+    lambda key, ladder: NAMES.add_many(key[0], ladder.names)
+)
+
+EMBEDS = messages.EmbedCache()
+models.CACHE.eviction_listeners.append(EMBEDS.evict)
+metrics.Collected(
+    "harold_embed_cache", "Rendered embed cache.", "gauge", "stat", EMBEDS.stats
+)
+
+# Every shard counts its users' queries, but only shard 0 prefetches.
+PREFETCHER = prefetch.Prefetcher()
+models.QUERY_LISTENERS.append(PREFETCHER.touch)
+if config.SHARD_ID == 0:
+    models.SNAPSHOT_LISTENERS.append(PREFETCHER.observe)
+
+
+async def post_changes(channel_id, response):
+    channel = HAROLD.get_channel(channel_id)
+    if channel is not None:
+        await channel.send(embed=messages.build_stats_embed(response))
+
+
+WATCHER = watch.Watcher(notify=post_changes)
+models.SNAPSHOT_LISTENERS.append(WATCHER.observe)
+
+SHARDS = {}
+if config.SHARD_COUNT > 1:
+    SHARDS = {"shard_id": config.SHARD_ID, "shard_count": config.SHARD_COUNT}
+    models.SHARED = shared.SharedSnapshots(config.SHARED_CACHE_DB)
+    if config.SHARD_ID == 0:
+        LEADERBOARD.listeners.append(models.SHARED.put_ladder)
+    metrics.Collected(
+        "harold_shared_cache",
+        "Snapshots shared between shards.",
+        "gauge",
+        "stat",
+        models.SHARED.stats,
+    )
+
+
+class Harold(commands.Bot):
+    async def start(self, *args, **kwargs):
+        # The bot runs without the endpoint rather than not at all, e.g. when
+        # another deployment on this host already serves that port.
+        try:
+            self.metrics_runner = await metrics.serve(
+                config.METRICS_HOST, config.METRICS_PORT
+            )
+        except OSError:
+            self.metrics_runner = None
+            harold_logger.exception(
+                "Couldn't serve metrics on %s:%s",
+                config.METRICS_HOST,
+                config.METRICS_PORT,
+            )
+        self.background_tasks = [
+            self.loop.create_task(HISTORY.run()),
+            self.loop.create_task(WATCHER.run()),
+        ]
+        # Shard 0 crawls for everyone; the other shards get its pages and
+        # ladders through the shared cache, and send it their query counts.
+        if config.SHARD_ID == 0:
+            take = models.SHARED.take_queries if models.SHARED else None
+            self.background_tasks.append(
+                self.loop.create_task(PREFETCHER.run(take))
+            )
+            if config.LEADERBOARD_ENABLED:
+                self.background_tasks.append(
+                    self.loop.create_task(LEADERBOARD.run())
+                )
+        else:
+            self.background_tasks.append(
+                self.loop.create_task(
+                    PREFETCHER.report(models.SHARED.put_queries)
+                )
+            )
+            if config.LEADERBOARD_ENABLED:
+                self.background_tasks.append(
+                    self.loop.create_task(
+                        LEADERBOARD.follow(models.SHARED.ladders)
+                    )
+                )
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        for task in getattr(self, "background_tasks", ()):
+            task.cancel()
+        await HISTORY.close()
+        await models.close_session()
+        models.PARSE_POOL.close()
+        if models.SHARED is not None:
+            await models.SHARED.close()
+        if getattr(self, "metrics_runner", None):
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+
+HAROLD = Harold(command_prefix="?", description=description, **SHARDS)
+
+
+@HAROLD.before_invoke
+async def start_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+
+@HAROLD.after_invoke
+async def stop_timer(ctx):
+    metrics.COMMAND_SECONDS.observe(
+        ctx.command.qualified_name, time.perf_counter() - ctx.started_at
+    )
+
+
+@HAROLD.event
+async def on_command_error(ctx, error):
+    metrics.ERRORS.inc(f"command_{error.__class__.__name__}")
+    harold_logger.error(
+        "Command %s failed",
+        ctx.command,
+        exc_info=(type(error), error, error.__traceback__),
+    )
+
+
+async def resolve(ctx, entity, name):
+    """Return the name to query. An unknown name that is an obvious typo of
+    a known one is corrected before anything is fetched."""
+    if NAMES.known(entity, name):
+        return name
+
+    correction = NAMES.correction(entity, name)
+    if correction is None:
+        return name
+
+    metrics.NAMES.inc("corrected")
+    await ctx.send(f"🔎 I'm assuming you meant '{correction}'.")
+    return correction
+
+
+def did_you_mean(entity, name):
+    suggestions = NAMES.suggest(entity, name)
+    if not suggestions:
+        return ""
+
+    metrics.NAMES.inc("suggested")
+    return " Did you mean " + " or ".join(f"'{s}'" for s in suggestions) + "?"
+
+
+def expand_tables(tables):
+    """The tables asked for, in order and without repeats. "all" stands for
+    every supported table, and tables can also be given comma separated."""
+    expanded = []
+    for table in ",".join(tables).split(","):
+        table = table.strip()
+        for table in (
+            config.SUPPORTED_TABLE_COMMANDS if table == "all" else (table,)
+        ):
+            if table and table not in expanded:
+                expanded.append(table)
+    return expanded
+
+
+async def send_summary(ctx, entity, name, tables):
+    """Answer several tables of one entity from a single fetch of its page,
+    in one message: the amounts of every table, with the server and realm
+    ranks of those that have them."""
+    quoted = models.entity_url(entity, name)
+    snapshot = await models.get_snapshot(quoted)
+    if isinstance(snapshot, str):
+        await ctx.send(f"⚠️ {snapshot}")
+        return
+    if not snapshot:
+        await ctx.send(
+            f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your query. Is '{name}' spelled correctly?"
+            + did_you_mean(entity, name)
+        )
+        return
+
+    def build(_):
+        with metrics.timer("project"):
+            frame = engine.Frame([snapshot])
+            responses = {
+                table: stats.CALLBACK_MAP[table].project(frame)[0]
+                for table in tables
+            }
+            ranks = {
+                table: {
+                    comparison: views.CALLBACK_MAP[table].project(frame)[0]
+                    for comparison, views in (
+                        ("server", rank_server),
+                        ("realm", rank_realm),
+                    )
+                }
+                for table in tables
+                if table in rank_server.CALLBACK_MAP
+            }
+        return messages.EMBED_MESSAGE_MAP["all"](responses, ranks)
+
+    with metrics.timer("embed"):
+        embed = EMBEDS.render(
+            models.canonical_url(quoted),
+            ("all", tuple(tables)),
+            snapshot.header(),
+            build,
+        )
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
 
 
 @HAROLD.command(escription="Get statistics about characters.")
-async def character(ctx, name, table):
+async def character(ctx, name, *tables):
     """Get character statistics.
 
     Arguments:
 
         name :: The name of the character
-        table :: The name of the metric you want to query. 
+        tables :: The name of the metric you want to query, several of
+            them, or "all". Several are answered from one page fetch.
 
     Examples:
         
@@ -66,14 +297,31 @@ async def character(ctx, name, table):
         ?character Debug solos
         ?character Debug deaths
         ?character Debug irs
+        ?character Debug kd
+        ?character Debug solo%
+        ?character Debug rpk
+        ?character Debug rps kills deaths
+        ?character Debug all
 
     """
-    if table not in config.SUPPORTED_TABLE_COMMANDS:
-        await ctx.send(f"⚠️ I can't find data for table: {table}.")
-
-    quoted = (
-        f"http://{urllib.parse.quote(f'herald.playphoenix.online/c/{name}/')}"
-    )
+    tables = expand_tables(tables)
+    if not tables:
+        await ctx.send(f"⚠️ I need a table to look up, or all of them.")
+        return
+    for table in tables:
+        if table not in config.SUPPORTED_TABLE_COMMANDS:
+            await ctx.send(f"⚠️ I can't find data for table: {table}.")
+            return
+
+    if len(tables) > 1:
+        name = await resolve(ctx, "c", name)
+        await send_summary(ctx, "c", name, tables)
+        return
+
+    (table,) = tables
+
+    name = await resolve(ctx, "c", name)
+    quoted = models.entity_url("c", name)
     model = models.MODEL_MAP.get(table)
     embed_message_model = messages.EMBED_MESSAGE_MAP.get(table)
 
@@ -81,24 +329,35 @@ async def character(ctx, name, table):
     if table not in ("realm kills", "rank"):
         callback = stats.CALLBACK_MAP.get(table)
 
-    response = model(callback)(quoted) if callback else model(None)(quoted)
-    if not response:
+    response = await model(callback)(quoted)
+    if isinstance(response, str):
+        await ctx.send(f"⚠️ {response}")
+    elif not response:
         await ctx.send(
             f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your character query. Is '{name}' a character name?"
+            + did_you_mean("c", name)
         )
     else:
-        embed = embed_message_model(response)
-        await ctx.send(embed=embed)
+        with metrics.timer("embed"):
+            embed = EMBEDS.render(
+                models.canonical_url(quoted),
+                table,
+                response,
+                embed_message_model,
+            )
+        with metrics.timer("send"):
+            await ctx.send(embed=embed)
 
 
 @HAROLD.command(description="Get statistics about guilds.")
-async def guild(ctx, guild, table):
+async def guild(ctx, guild, *tables):
     """Get guild statisitics.
 
     Arguments:
 
         guild :: The name of the character
-        table :: The name of the metric you want to query. 
+        tables :: The name of the metric you want to query, several of
+            them, or "all". Several are answered from one page fetch.
 
     Examples:
 
@@ -108,13 +367,28 @@ async def guild(ctx, guild, table):
             ?guild 'Swipe Right' solos
             ?guild 'Swipe Right' deaths
             ?guild 'Swipe Right' irs
+            ?guild 'Swipe Right' kd
+            ?guild 'Swipe Right' rps,kills,deaths
+            ?guild 'Swipe Right' all
     """
-    if table not in config.SUPPORTED_TABLE_COMMANDS:
-        await ctx.send(f"⚠️ I can't find data for table: {table}.")
-
-    quoted = (
-        f"http://{urllib.parse.quote(f'herald.playphoenix.online/g/{guild}/')}"
-    )
+    tables = expand_tables(tables)
+    if not tables:
+        await ctx.send(f"⚠️ I need a table to look up, or all of them.")
+        return
+    for table in tables:
+        if table not in config.SUPPORTED_TABLE_COMMANDS:
+            await ctx.send(f"⚠️ I can't find data for table: {table}.")
+            return
+
+    if len(tables) > 1:
+        guild = await resolve(ctx, "g", guild)
+        await send_summary(ctx, "g", guild, tables)
+        return
+
+    (table,) = tables
+
+    guild = await resolve(ctx, "g", guild)
+    quoted = models.entity_url("g", guild)
     model = models.MODEL_MAP.get(table)
     embed_message_model = messages.EMBED_MESSAGE_MAP.get(table)
 
@@ -122,13 +396,22 @@ async def guild(ctx, guild, table):
     if table not in ("realm kills", "rank"):
         callback = stats.CALLBACK_MAP.get(table)
 
-    response = model(callback)(quoted) if callback else model(None)(quoted)
+    response = await model(callback)(quoted)
+    if isinstance(response, str):
+        await ctx.send(f"⚠️ {response}")
+        return
     if not response:
         await ctx.send(
             f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your guild query. Is '{guild}' a guild name?"
+            + did_you_mean("g", guild)
+        )
+        return
+    with metrics.timer("embed"):
+        embed = EMBEDS.render(
+            models.canonical_url(quoted), table, response, embed_message_model
         )
-    embed = embed_message_model(response)
-    await ctx.send(embed=embed)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
 
 
 @HAROLD.command(description="Get ranks for character or guilds.")
@@ -154,27 +437,44 @@ async def rank(ctx, entity, name, table, comparison):
     """
     if entity not in ("character", "guild"):
         await ctx.send(f"⚠️ You can only get ranks for characters or guilds.")
+        return
 
     if comparison not in ("server", "realm"):
         await ctx.send(
             f"⚠️ You can only get ranks relative to realm or server."
         )
+        return
     if table not in config.SUPPORTED_TABLE_COMMANDS:
         await ctx.send(f"⚠️ I can't find data for table: {table}.")
+        return
 
     entity = "c" if entity == "character" else "g"
-    quoted = f"http://{urllib.parse.quote(f'herald.playphoenix.online/{entity}/{name}/')}"
+    name = await resolve(ctx, entity, name)
+    quoted = models.entity_url(entity, name)
     model = models.MODEL_MAP.get("rank")
     embed_message_model = messages.EMBED_MESSAGE_MAP.get(table)
 
-    callback = rank_realm.CALLBACK_MAP.get(table)
-    response = model(callback)(quoted)
+    rank_callbacks = rank_server if comparison == "server" else rank_realm
+    callback = rank_callbacks.CALLBACK_MAP.get(table)
+    response = await model(callback)(quoted)
+    if isinstance(response, str):
+        await ctx.send(f"⚠️ {response}")
+        return
     if not response:
         await ctx.send(
             f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your query."
+            + did_you_mean(entity, name)
+        )
+        return
+    with metrics.timer("embed"):
+        embed = EMBEDS.render(
+            models.canonical_url(quoted),
+            ("rank", table, comparison),
+            response,
+            embed_message_model,
         )
-    embed = embed_message_model(response)
-    await ctx.send(embed=embed)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
 
 
 @HAROLD.command(description="Get kills for each realm.")
@@ -194,26 +494,510 @@ async def realm(ctx, entity, name, realm):
     """
     if entity not in ("character", "guild"):
         await ctx.send(f"⚠️ You can only get ranks for characters or guilds.")
+        return
 
     if realm.lower() not in ("albion", "midgard", "hibernia"):
         await ctx.send(
             f"⚠️ There are only 3 realms: Hibernia, Midgard, Albion."
         )
+        return
     entity = "c" if entity == "character" else "g"
-    quoted = f"http://{urllib.parse.quote(f'herald.playphoenix.online/{entity}/{name}/')}"
+    name = await resolve(ctx, entity, name)
+    quoted = models.entity_url(entity, name)
     model = models.MODEL_MAP.get("realm kills")
     embed_message_model = messages.EMBED_MESSAGE_MAP.get("realm kills")
 
     callback = realm_kills.CALLBACK_MAP.get(realm)
-    response = model(callback)(quoted) if callback else model(None)(quoted)
+    response = await model(callback)(quoted)
 
+    if isinstance(response, str):
+        await ctx.send(f"⚠️ {response}")
+        return
     if not response:
         await ctx.send(
             f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your query."
+            + did_you_mean(entity, name)
+        )
+        return
+    with metrics.timer("embed"):
+        embed = EMBEDS.render(
+            models.canonical_url(quoted),
+            ("realm", realm),
+            response,
+            embed_message_model,
+        )
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+@HAROLD.command(description="Compare characters or guilds side by side.")
+async def compare(ctx, entity, *names_and_table):
+    """Compare one statistic across several characters or guilds. All pages
+    are fetched at the same time.
+
+    Arguments:
+
+        entity :: Character or guild.
+        names :: Two or more character or guild names.
+        table :: The name of the metric you want to compare.
+
+    Examples:
+
+        ?compare character Debug Ælfríc Newbie rps
+        ?compare guild 'Swipe Right' 'Left Swipe' irs
+    """
+    if entity not in ("character", "guild"):
+        await ctx.send(f"⚠️ You can only compare characters or guilds.")
+        return
+
+    if len(names_and_table) < 3:
+        await ctx.send(f"⚠️ I need at least two names and a table to compare.")
+        return
+
+    *names, table = names_and_table
+
+    if len(names) > config.COMPARE_MAX_ENTITIES:
+        await ctx.send(
+            f"⚠️ I can compare at most {config.COMPARE_MAX_ENTITIES} names at once."
+        )
+        return
+
+    if table not in config.SUPPORTED_TABLE_COMMANDS:
+        await ctx.send(f"⚠️ I can't find data for table: {table}.")
+        return
+
+    entity = "c" if entity == "character" else "g"
+    names = [await resolve(ctx, entity, name) for name in names]
+    snapshots = await asyncio.gather(
+        *[models.get_snapshot(models.entity_url(entity, name)) for name in names]
+    )
+    for name, snapshot in zip(names, snapshots):
+        if isinstance(snapshot, str):
+            await ctx.send(f"⚠️ {snapshot}")
+            return
+        if not snapshot:
+            await ctx.send(
+                f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your query. Is '{name}' spelled correctly?"
+                + did_you_mean(entity, name)
+            )
+            return
+
+    view = stats.CALLBACK_MAP.get(table)
+    embed_message_model = messages.EMBED_MESSAGE_MAP.get("compare")
+    with metrics.timer("project"):
+        responses = dict(zip(names, view.project(engine.Frame(snapshots))))
+    with metrics.timer("embed"):
+        embed = embed_message_model(responses)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+@HAROLD.command(name="history", description="Get the change in a statistic.")
+async def get_history(ctx, entity, name, table, days: int = 7):
+    """Get how much a statistic changed over the last few days. Answered from
+    the snapshots the bot has already seen; the Herald is not queried.
+
+    Arguments:
+
+        entity :: Character or guild.
+        name :: The name of the character or guild.
+        table :: The name of the metric you want to query.
+        days :: How many days to look back. Defaults to 7.
+
+    Examples:
+
+        ?history character Debug rps
+        ?history guild 'Swipe Right' kills 3
+    """
+    if entity not in ("character", "guild"):
+        await ctx.send(f"⚠️ I only keep history for characters or guilds.")
+        return
+
+    metric = history.HISTORY_METRICS.get(table)
+    if metric is None:
+        await ctx.send(f"⚠️ I don't keep history for table: {table}.")
+        return
+
+    entity = "c" if entity == "character" else "g"
+    quoted = models.entity_url(entity, name)
+    since = time.time() - days * 86400
+    await HISTORY.flush()
+    baseline, latest = await HISTORY.change(quoted, metric, since)
+    if latest is None:
+        await ctx.send(f"⚠️ I haven't recorded any history for '{name}' yet.")
+        return
+
+    then = time.strftime("%Y-%m-%d %H:%M", time.gmtime(baseline[0]))
+    response = {
+        "Then": baseline[2],
+        "Now": latest[2],
+        "Change": f"{latest[2] - baseline[2]:+}",
+        "Last Updated": latest[1],
+        "Description": name,
+        "URL": quoted,
+        "Embed Description": f"{metric} since {then} (UTC)",
+    }
+    embed_message_model = messages.EMBED_MESSAGE_MAP.get(table)
+    with metrics.timer("embed"):
+        embed = embed_message_model(response)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+@HAROLD.command(description="Get the top characters or guilds.")
+async def top(ctx, table, window="week", entity="character", count: int = 10):
+    """Get the best characters or guilds for a metric. Answered from the
+    local leaderboard index.
+
+    Arguments:
+
+        table :: rps, kills, deathblows, solos or deaths.
+        window :: all, week, lastweek or 48h. Defaults to week.
+        entity :: Character or guild. Defaults to character.
+        count :: How many to show. Defaults to 10.
+
+    Examples:
+
+        ?top rps week
+        ?top kills 48h guild 20
+    """
+    if table not in config.LEADERBOARD_METRICS:
+        await ctx.send(f"⚠️ I don't keep a leaderboard for table: {table}.")
+        return
+
+    if window not in config.LEADERBOARD_WINDOWS:
+        await ctx.send(f"⚠️ The time window must be all, week, lastweek or 48h.")
+        return
+
+    if entity not in ("character", "guild"):
+        await ctx.send(f"⚠️ You can only rank characters or guilds.")
+        return
+
+    ladder = LEADERBOARD.get(entity[0], table, window)
+    if ladder is None:
+        if not config.LEADERBOARD_ENABLED:
+            await ctx.send(f"⚠️ The leaderboard index is switched off.")
+            return
+        await ctx.send(f"⚠️ That leaderboard hasn't been loaded yet.")
+        return
+
+    count = max(1, min(count, config.LEADERBOARD_TOP_MAX))
+    response = {
+        f"{rank}. {name}": f"{value:,}"
+        for rank, (name, value) in enumerate(ladder.top(count), start=1)
+    }
+    response.update(
+        {
+            "Description": f"Top {count} {entity}s",
+            "Embed Description": f"{table} ({window})",
+            "Last Updated": ladder.last_updated,
+        }
+    )
+    with metrics.timer("embed"):
+        embed = messages.build_stats_embed(response)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+@HAROLD.command(description="Get where a character or guild ranks.")
+async def percentile(ctx, entity, name, table, window="week"):
+    """Get the rank and percentile of a character or guild on the local
+    leaderboard index. Only the top ranking pages are crawled, so the
+    percentile is among those.
+
+    Arguments:
+
+        entity :: Character or guild.
+        name :: The name of the character or guild.
+        table :: rps, kills, deathblows, solos or deaths.
+        window :: all, week, lastweek or 48h. Defaults to week.
+
+    Examples:
+
+        ?percentile character Debug rps
+        ?percentile guild 'Swipe Right' kills all
+    """
+    if entity not in ("character", "guild"):
+        await ctx.send(f"⚠️ You can only rank characters or guilds.")
+        return
+
+    if table not in config.LEADERBOARD_METRICS:
+        await ctx.send(f"⚠️ I don't keep a leaderboard for table: {table}.")
+        return
+
+    if window not in config.LEADERBOARD_WINDOWS:
+        await ctx.send(f"⚠️ The time window must be all, week, lastweek or 48h.")
+        return
+
+    ladder = LEADERBOARD.get(entity[0], table, window)
+    if ladder is None:
+        if not config.LEADERBOARD_ENABLED:
+            await ctx.send(f"⚠️ The leaderboard index is switched off.")
+            return
+        await ctx.send(f"⚠️ That leaderboard hasn't been loaded yet.")
+        return
+
+    rank = ladder.rank(name)
+    if rank is None:
+        await ctx.send(
+            f"⚠️ '{name}' isn't in the top {len(ladder)} for {table} ({window})."
+        )
+        return
+
+    value = ladder.value(name)
+    response = {
+        "Rank": f"{rank:,} of {len(ladder):,}",
+        "Amount": f"{value:,}",
+        "Percentile": (
+            f"{ladder.percentile(value):.1f} among the top {len(ladder):,}"
+        ),
+        "Description": name,
+        "Embed Description": f"{table} ({window})",
+        "Last Updated": ladder.last_updated,
+    }
+    with metrics.timer("embed"):
+        embed = messages.build_stats_embed(response)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+@HAROLD.command(name="roster", description="Rank the members of a guild.")
+async def guild_roster(ctx, guild, table="rps", window="week", count: int = 10):
+    """Rank a guild's members by a statistic. Every member's character page
+    is fetched, several at a time.
+
+    Arguments:
+
+        guild :: The name of the guild.
+        table :: rps, kills, deathblows, solos or deaths. Defaults to rps.
+        window :: all, week, lastweek or 48h. Defaults to week.
+        count :: How many members to show. Defaults to 10.
+
+    Examples:
+
+        ?roster 'Swipe Right'
+        ?roster 'Swipe Right' kills 48h 15
+    """
+    metric = history.HISTORY_METRICS.get(table)
+    if metric is None:
+        await ctx.send(f"⚠️ I can't rank members by table: {table}.")
+        return
+
+    period = roster.WINDOW_PERIODS.get(window)
+    if period is None:
+        await ctx.send(f"⚠️ The time window must be all, week, lastweek or 48h.")
+        return
+
+    if not config.ROSTER_ENABLED:
+        await ctx.send(f"⚠️ Rosters are switched off.")
+        return
+
+    guild = await resolve(ctx, "g", guild)
+    endpoint = models.entity_url("g", guild)
+    snapshot = await models.get_snapshot(endpoint)
+    if isinstance(snapshot, str):
+        await ctx.send(f"⚠️ {snapshot}")
+        return
+    if not snapshot:
+        await ctx.send(
+            f"⚠️ Redirected to {config.FAILED_RESPONSE_REDIRECT}. Check your guild query. Is '{guild}' a guild name?"
+            + did_you_mean("g", guild)
         )
-    embed = embed_message_model(response)
-    await ctx.send(embed=embed)
+        return
+    members = await roster.fetch_roster(endpoint)
+    if isinstance(members, str):
+        await ctx.send(f"⚠️ {members}")
+        return
+    if not members:
+        await ctx.send(f"⚠️ I can't find the members of '{guild}'.")
+        return
+    NAMES.add_many("c", members)
+
+    listed = members[: config.ROSTER_MAX_MEMBERS]
+    snapshots = await roster.fetch_members(listed)
+    if not snapshots:
+        await ctx.send(f"⚠️ I couldn't load any of the members of '{guild}'.")
+        return
+
+    count = max(1, min(count, config.ROSTER_TOP_MAX))
+    with metrics.timer("project"):
+        names = list(snapshots)
+        frame = engine.Frame(snapshots.values())
+        ranked = roster.rank(names, frame, metric, period)[:count]
+        totals = roster.aggregate(names, frame, period)
+    response = {
+        f"{place}. {name}": f"{amount:,}"
+        for place, (name, amount) in enumerate(ranked, start=1)
+    }
+    for summed, (total, best, amount) in totals.items():
+        response[f"Total {summed}"] = f"{total:,} (best: {best}, {amount:,})"
+    response["Members"] = f"{len(snapshots)} of {len(members)}"
+    response.update(snapshot.header())
+    response["Embed Description"] = f"Members by {metric} ({period})"
+    with metrics.timer("embed"):
+        embed = messages.build_stats_embed(response)
+    with metrics.timer("send"):
+        await ctx.send(embed=embed)
+
+
+def watched_metrics(table):
+    """The metrics `table` stands for: one, or all of them when it's None."""
+    if table is None:
+        return models.Snapshot.METRICS
+    metric = history.HISTORY_METRICS.get(table)
+    return None if metric is None else (metric,)
+
+
+@HAROLD.command(
+    name="watch", description="Get told when a character or guild changes."
+)
+async def watch_entity(ctx, entity=None, name=None, table=None):
+    """Post to this channel whenever a character's or guild's statistics
+    change on the Herald. Without arguments, list what this channel watches.
+
+    Arguments:
+
+        entity :: Character or guild.
+        name :: The name of the character or guild.
+        table :: rps, kills, deathblows, solos or deaths. Defaults to all.
+
+    Examples:
+
+        ?watch character Debug rps
+        ?watch guild 'Swipe Right'
+        ?watch
+    """
+    if entity is None:
+        watched = WATCHER.subscriptions(ctx.channel.id)
+        if not watched:
+            await ctx.send("👀 This channel isn't watching anything.")
+            return
+        await ctx.send(
+            "👀 Watching: "
+            + ", ".join(f"{name} ({metric})" for name, metric in watched)
+        )
+        return
+
+    if entity not in ("character", "guild") or name is None:
+        await ctx.send(f"⚠️ You can only watch characters or guilds.")
+        return
+
+    metrics_watched = watched_metrics(table)
+    if metrics_watched is None:
+        await ctx.send(f"⚠️ I can't watch table: {table}.")
+        return
+
+    entity = "c" if entity == "character" else "g"
+    name = await resolve(ctx, entity, name)
+    quoted = models.entity_url(entity, name)
+    added, error = await WATCHER.watch(
+        quoted, name, ctx.channel.id, metrics_watched
+    )
+    if error:
+        await ctx.send(f"⚠️ {error}" + did_you_mean(entity, name))
+        return
+    if not added:
+        await ctx.send(f"👀 This channel is already watching '{name}'.")
+        return
+    await ctx.send(f"👀 I'll post here when '{name}' changes.")
+
+
+@HAROLD.command(description="Stop being told about a character or guild.")
+async def unwatch(ctx, entity, name, table=None):
+    """Stop posting changes of a character or guild to this channel.
+
+    Arguments:
+
+        entity :: Character or guild.
+        name :: The name of the character or guild.
+        table :: rps, kills, deathblows, solos or deaths. Defaults to all.
+
+    Examples:
+
+        ?unwatch character Debug
+        ?unwatch guild 'Swipe Right' kills
+    """
+    if entity not in ("character", "guild"):
+        await ctx.send(f"⚠️ You can only watch characters or guilds.")
+        return
+
+    metrics_watched = watched_metrics(table)
+    if metrics_watched is None:
+        await ctx.send(f"⚠️ I can't watch table: {table}.")
+        return
+
+    quoted = models.entity_url(entity[0], name)
+    if not WATCHER.unwatch(quoted, ctx.channel.id, metrics_watched):
+        await ctx.send(f"⚠️ This channel isn't watching '{name}'.")
+        return
+    await ctx.send(f"👀 I've stopped watching '{name}' here.")
+
+
+@HAROLD.command(description="Show latency and cache statistics.")
+@commands.is_owner()
+async def botstats(ctx):
+    """Show p50/p99 latency per stage and the cache, limiter and error
+    counters. Full histograms are served on the local metrics endpoint.
+    """
+    response = {}
+    for stage in metrics.STAGES:
+        p50 = metrics.STAGE_SECONDS.quantile(stage, 0.5) * 1000
+        p99 = metrics.STAGE_SECONDS.quantile(stage, 0.99) * 1000
+        count = metrics.STAGE_SECONDS.count(stage)
+        response[stage.title()] = f"{p50:.1f} / {p99:.1f} ms ({count})"
+
+    cache_stats = models.CACHE.stats()
+    response["Cache"] = (
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+    embed_stats = EMBEDS.stats()
+    response["Embeds"] = (
+        f"{embed_stats['hits']} reused / {embed_stats['misses']} built"
+    )
+    revalidations = metrics.REVALIDATIONS.values
+    response["Revalidated"] = (
+        f"{int(revalidations.get('not_modified', 0))} not modified / "
+        f"{int(revalidations.get('unchanged', 0))} same body / "
+        f"{int(revalidations.get('changed', 0))} changed"
+    )
+    if models.SHARED is not None:
+        shared_stats = models.SHARED.stats()
+        response["Shard"] = (
+            f"{config.SHARD_ID + 1} of {config.SHARD_COUNT}, "
+            f"{shared_stats['hits']} found / {shared_stats['writes']} written"
+        )
+    missing_stats = models.MISSING.stats()
+    response["Unknown Names"] = (
+        f"{missing_stats['hits']} answered locally / {missing_stats['size']} cached"
+    )
+    limiter_stats = models.LIMITER.stats()
+    response["Herald Limit"] = (
+        f"{limiter_stats['in_flight']}/{limiter_stats['limit']} "
+        f"({limiter_stats['queued']} queued)"
+    )
+    response["Errors"] = (
+        ", ".join(
+            f"{kind}: {int(total)}"
+            for kind, total in metrics.ERRORS.values.items()
+        )
+        or "None"
+    )
+    response.update(
+        {
+            "Description": "Harold",
+            "Embed Description": "p50 / p99 latency (samples)",
+            "Last Updated": time.strftime(
+                "%Y-%m-%d %H:%M:%S (UTC)", time.gmtime()
+            ),
+        }
+    )
+    await ctx.send(embed=messages.build_stats_embed(response))
 
 
 if __name__ == "__main__":
+    if config.SHARD_COUNT > 1:
+        setup_logging(f"log/discord.{config.SHARD_ID}.log")
+    else:
+        setup_logging()
+    models.PARSE_POOL.start()
     HAROLD.run(config.TOKEN)
@@ -0,0 +1,168 @@
+"""
+A local SQLite record of every snapshot the bot has parsed, so statistics
+can be compared over time without going back to the Herald.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import config
+import models
+
+HISTORY_METRICS = {
+    "rps": "Realm Points",
+    "deathblows": "Deathblows",
+    "deaths": "Deaths",
+    "kills": "Kills",
+    "solos": "Solo Kills",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    url TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    last_updated TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (url, metric, updated_at)
+);
+"""
+
+
+class HistoryStore:
+    """Append "All Time" amounts of each snapshot to SQLite.
+
+    Snapshots are queued by `record` and written in batches by `run` on a
+    single worker thread, so the event loop never waits on the disk. Rows are
+    keyed by canonical entity URL and the Herald's "Last Updated" time, which
+    means a page that hasn't changed is only stored once.
+
+    Example:
+
+    store = HistoryStore("data/history.db")
+    models.SNAPSHOT_LISTENERS.append(store.record)
+    bot.loop.create_task(store.run())
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = config.HISTORY_BATCH_SIZE,
+        flush_interval: float = config.HISTORY_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self._full = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="history"
+        )
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Shard processes write to the same database.
+            self._connection = sqlite3.connect(
+                self.path,
+                timeout=config.SHARED_CACHE_TIMEOUT,
+                check_same_thread=False,
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    async def _submit(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def record(self, snapshot: models.Snapshot) -> None:
+        """Queue `snapshot` to be written. Never blocks."""
+        self.pending.append(snapshot)
+        if len(self.pending) >= self.batch_size:
+            self._full.set()
+
+    @staticmethod
+    def _rows(snapshot: models.Snapshot) -> List[tuple]:
+        url = models.canonical_url(snapshot.url)
+        updated_at = snapshot.updated_at or time.time()
+        return [
+            (
+                url,
+                updated_at,
+                snapshot.last_updated,
+                metric,
+                snapshot.amount(metric, "All Time"),
+            )
+            for metric in snapshot.METRICS
+        ]
+
+    def _write(self, snapshots: List[models.Snapshot]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO history VALUES (?, ?, ?, ?, ?)",
+                [row for snapshot in snapshots for row in self._rows(snapshot)],
+            )
+
+    async def flush(self) -> None:
+        """Write everything currently queued."""
+        batch, self.pending = self.pending, []
+        if batch:
+            await self._submit(self._write, batch)
+
+    async def run(self) -> None:
+        """Write queued snapshots every `flush_interval` seconds, or as soon
+        as `batch_size` are waiting, until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._connection is not None:
+            await self._submit(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    def _select_change(
+        self, url: str, metric: str, since: float
+    ) -> Tuple[Optional[tuple], Optional[tuple]]:
+        connection = self._connect()
+        select = (
+            "SELECT updated_at, last_updated, value FROM history "
+            "WHERE url = ? AND metric = ? "
+        )
+        baseline = connection.execute(
+            select + "AND updated_at <= ? ORDER BY updated_at DESC LIMIT 1",
+            (url, metric, since),
+        ).fetchone()
+        if baseline is None:
+            baseline = connection.execute(
+                select + "ORDER BY updated_at LIMIT 1", (url, metric)
+            ).fetchone()
+        latest = connection.execute(
+            select + "ORDER BY updated_at DESC LIMIT 1", (url, metric)
+        ).fetchone()
+        return baseline, latest
+
+    async def change(
+        self, endpoint: str, metric: str, since: float
+    ) -> Tuple[Optional[tuple], Optional[tuple]]:
+        """Return the (updated_at, last_updated, value) rows of `metric` as
+        of the UNIX time `since` and as of the latest Herald update. When
+        nothing was recorded before `since` the oldest row stands in."""
+        return await self._submit(
+            self._select_change, models.canonical_url(endpoint), metric, since
+        )
@@ -0,0 +1,188 @@
+"""
+A local index of the Herald's ranking pages, so top-N and percentile
+questions are answered without loading any entity pages.
+"""
+import asyncio
+import bisect
+import logging
+import time
+
+from array import array
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from lxml import etree, html
+
+import config
+import metrics
+import models
+
+logger = logging.getLogger("harold.leaderboard")
+
+# Ladder rows: the name is the first link in the row and the amount is the
+# last cell.
+_LADDER_ROWS = etree.XPath("/html/body/main//table/tbody/tr")
+_ROW_NAME = etree.XPath("string(.//a[1])")
+_ROW_VALUE = etree.XPath("string(td[last()])")
+
+
+def parse_ladder(content: bytes) -> List[Tuple[str, int]]:
+    """Extract (name, amount) pairs from one Herald ranking page."""
+    entries = []
+    for row in _LADDER_ROWS(html.fromstring(content)):
+        name = _ROW_NAME(row).strip()
+        value = _ROW_VALUE(row).strip().replace(",", "")
+        if name and value.isdigit():
+            entries.append((name, int(value)))
+    return entries
+
+
+class Ladder:
+    """One metric and time window, sorted from best to worst.
+
+    Amounts are kept in two flat integer arrays: descending for top-N
+    slices and ascending for binary searching percentiles. Names map to
+    their position for rank lookups.
+
+    Example:
+
+    ladder = Ladder([("Debug", 1200), ("Newbie", 10), ("Ælfríc", 300)])
+    ladder.top(2)  # [("Debug", 1200), ("Ælfríc", 300)]
+    ladder.percentile(300)  # 33.3...
+    """
+
+    def __init__(self, entries: List[Tuple[str, int]]) -> None:
+        self.crawled_at = time.time()
+        entries = sorted(entries, key=lambda entry: entry[1], reverse=True)
+        self.names = [name for name, _ in entries]
+        self.values = array("q", (value for _, value in entries))
+        self.ascending = array("q", reversed(self.values))
+        self.positions = {
+            name.lower(): position
+            for position, name in reversed(list(enumerate(self.names)))
+        }
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def last_updated(self) -> str:
+        crawled = time.strftime("%Y-%m-%d %H:%M", time.gmtime(self.crawled_at))
+        return f"Crawled: {crawled} (UTC)"
+
+    def top(self, count: int) -> List[Tuple[str, int]]:
+        return list(zip(self.names[:count], self.values[:count]))
+
+    def rank(self, name: str) -> Optional[int]:
+        """1-based rank of `name`, or None if it isn't on the ladder."""
+        position = self.positions.get(name.lower())
+        return None if position is None else position + 1
+
+    def value(self, name: str) -> Optional[int]:
+        position = self.positions.get(name.lower())
+        return None if position is None else self.values[position]
+
+    def percentile(self, value: int) -> float:
+        """Percentage of the crawled ladder, i.e. the top
+        `LEADERBOARD_PAGES` pages, with a strictly lower amount."""
+        if not self.ascending:
+            return 0.0
+        below = bisect.bisect_left(self.ascending, value)
+        return 100 * below / len(self.ascending)
+
+
+class LeaderboardIndex:
+    """All ladders the bot knows about, keyed by (entity, metric, window).
+
+    Example:
+
+    index = LeaderboardIndex()
+    await index.ingest("c", "rps", "week")
+    index.get("c", "rps", "week").top(20)
+    """
+
+    def __init__(self) -> None:
+        self.ladders: Dict[Tuple[str, str, str], Ladder] = {}
+        # Called with ((entity, metric, window), ladder) whenever a ladder
+        # is replaced.
+        self.listeners: List[
+            Callable[[Tuple[str, str, str], Ladder], None]
+        ] = []
+
+    def get(self, entity: str, metric: str, window: str) -> Optional[Ladder]:
+        return self.ladders.get((entity, metric, window))
+
+    async def _fetch_page(
+        self, entity: str, metric: str, window: str, page: int
+    ) -> Optional[List[Tuple[str, int]]]:
+        """The entries of one ranking page, or None if it couldn't be
+        loaded."""
+        url = config.LEADERBOARD_URL.format(
+            entity=entity,
+            metric=config.LEADERBOARD_METRICS[metric],
+            window=config.LEADERBOARD_WINDOWS[window],
+            page=page,
+        )
+        response = await models.fetch(url)
+        if isinstance(response, str) or not response.ok:
+            logger.warning("Couldn't load ladder page %s", url)
+            return None
+        if response.url == config.FAILED_RESPONSE_REDIRECT:
+            metrics.ERRORS.inc("ladder_redirect")
+            logger.warning("Ladder page %s redirected to the Herald", url)
+            return None
+        entries = parse_ladder(response.content)
+        if not entries and page == 1:
+            metrics.ERRORS.inc("ladder_unparsed")
+            logger.warning("No rows found on ladder page %s", url)
+        return entries
+
+    async def ingest(self, entity: str, metric: str, window: str) -> Ladder:
+        """Crawl the ranking pages of one ladder and replace its index. If
+        any page fails the previous index is kept, as ranks and percentiles
+        over part of the ladder would be wrong."""
+        pages = await asyncio.gather(
+            *[
+                self._fetch_page(entity, metric, window, page)
+                for page in range(1, config.LEADERBOARD_PAGES + 1)
+            ]
+        )
+        if any(page is None for page in pages):
+            return self.ladders.get((entity, metric, window), Ladder([]))
+        ladder = Ladder([entry for page in pages for entry in page])
+        if len(ladder):
+            self._replace((entity, metric, window), ladder)
+        return ladder
+
+    def _replace(self, key: Tuple[str, str, str], ladder: Ladder) -> None:
+        self.ladders[key] = ladder
+        for listener in self.listeners:
+            listener(key, ladder)
+
+    async def refresh(self) -> None:
+        for entity in ("c", "g"):
+            for metric in config.LEADERBOARD_METRICS:
+                for window in config.LEADERBOARD_WINDOWS:
+                    await self.ingest(entity, metric, window)
+
+    async def run(self) -> None:
+        """Re-crawl every ladder every `LEADERBOARD_REFRESH` seconds."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(config.LEADERBOARD_REFRESH)
+
+    async def follow(
+        self,
+        load: Callable[
+            [float], Awaitable[Dict[Tuple[str, str, str], Ladder]]
+        ],
+        interval: float = config.LEADERBOARD_FOLLOW_INTERVAL,
+    ) -> None:
+        """Take the ladders another process crawls instead of crawling
+        them, checking every `interval` seconds until cancelled. `load`
+        returns the ladders crawled after a UNIX time."""
+        since = 0.0
+        while True:
+            for key, ladder in (await load(since)).items():
+                since = max(since, ladder.crawled_at)
+                self._replace(key, ladder)
+            await asyncio.sleep(interval)
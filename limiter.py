@@ -0,0 +1,97 @@
+"""
+An adaptive cap on how many requests we have in flight to the Herald.
+"""
+import asyncio
+import time
+
+from typing import Callable, Optional
+
+import config
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease concurrency limiter.
+
+    Every completed request reports its latency and status code to
+    `release`. While requests come back quickly and the limit is actually in
+    use, the limit grows by about one per limit's worth of requests. A 429,
+    a 5xx or a failed request (status None) cuts it by `backoff`, at most
+    once per `cooldown` seconds so that one burst of failures doesn't
+    collapse it to the floor. Slow responses stop growth.
+
+    Example:
+
+    limiter = AdaptiveLimiter()
+    await limiter.acquire()
+    try:
+        status = await do_request()
+    finally:
+        limiter.release(latency, status)
+    """
+
+    def __init__(
+        self,
+        initial: float = config.HERALD_LIMIT_INITIAL,
+        minimum: float = config.HERALD_LIMIT_MIN,
+        maximum: float = config.HERALD_LIMIT_MAX,
+        target_latency: float = config.HERALD_LIMIT_TARGET_LATENCY,
+        backoff: float = config.HERALD_LIMIT_BACKOFF,
+        cooldown: float = config.HERALD_LIMIT_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.clock = clock
+        self.in_flight = 0
+        self.queued = 0
+        self._last_backoff = float("-inf")
+        self._condition = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so that it binds to the bot's running loop.
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        """Wait until a request slot is free and take it."""
+        async with self.condition:
+            self.queued += 1
+            try:
+                await self.condition.wait_for(
+                    lambda: self.in_flight < int(self.limit)
+                )
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+
+    def release(self, latency: float, status: Optional[int]) -> None:
+        """Give back a slot and adapt the limit to how the request went."""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+
+        if status is None or status == 429 or status >= 500:
+            now = self.clock()
+            if now - self._last_backoff >= self.cooldown:
+                self._last_backoff = now
+                self.limit = max(self.minimum, self.limit * self.backoff)
+        elif latency <= self.target_latency and saturated:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        asyncio.ensure_future(self._notify())
+
+    async def _notify(self) -> None:
+        async with self.condition:
+            self.condition.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+        }
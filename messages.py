@@ -1,8 +1,12 @@
 """
 """
+from collections import OrderedDict, defaultdict
+from typing import Callable, Hashable
 
 import discord
 
+import config
+
 
 def build_stats_embed(response: dict):
     """
@@ -53,6 +57,84 @@ def build_realm_kills_embed(response: dict):
     return embed
 
 
+def build_compare_embed(responses: dict):
+    """Render one callback response per entity side by side.
+
+    Arguments:
+    responses :: {name: response}
+        Callback responses in the order they should be shown.
+    """
+    first = next(iter(responses.values()))
+    embed = discord.Embed(
+        title="Comparison", description=first.get("Embed Description")
+    )
+    embed.set_thumbnail(
+        url="https://playphoenix.online/assets/images/phoenix-logo.png"
+    )
+    for name, response in responses.items():
+        value = "\n".join(
+            f"{period}: {amount}"
+            for period, amount in response.items()
+            if period
+            not in ("Last Updated", "Description", "URL", "Embed Description")
+        )
+        embed.add_field(name=name, value=value, inline=True)
+
+    embed.set_footer(text=first.get("Last Updated"))
+
+    return embed
+
+
+def build_summary_embed(responses: dict, ranks: dict = None):
+    """Render several callback responses of one entity as one embed, with a
+    field per table.
+
+    Arguments:
+    responses :: {table: response}
+        Callback responses in the order they should be shown.
+    ranks :: {table: {comparison: response}}
+        Rank responses shown next to the amounts of the same period, for
+        the tables that have them.
+    """
+    ranks = ranks or {}
+    first = next(iter(responses.values()))
+    embed = discord.Embed(
+        title=first.get("Description"),
+        url=first.get("URL"),
+        description="All statistics",
+    )
+    embed.set_thumbnail(
+        url="https://playphoenix.online/assets/images/phoenix-logo.png"
+    )
+    for table, response in responses.items():
+        lines = []
+        for period, amount in response.items():
+            if period in (
+                "Last Updated",
+                "Description",
+                "URL",
+                "Embed Description",
+            ):
+                continue
+            placings = ", ".join(
+                f"#{rank[period]} {comparison}"
+                for comparison, rank in ranks.get(table, {}).items()
+                if rank.get(period) is not None
+            )
+            lines.append(
+                f"{period}: {amount}" + (f" ({placings})" if placings else "")
+            )
+        embed.add_field(
+            name=response.get("Embed Description"),
+            value="\n".join(lines),
+            inline=True,
+        )
+
+    embed.set_footer(text=first.get("Last Updated"))
+
+    return embed
+
+
 EMBED_MESSAGE_MAP = {
     "rps": build_stats_embed,
     "deathblows": build_stats_embed,
@@ -61,5 +143,93 @@ EMBED_MESSAGE_MAP = {
     "solos": build_stats_embed,
     "realm kills": build_stats_embed,
     "irs": build_stats_embed,
+    "kd": build_stats_embed,
+    "solo%": build_stats_embed,
+    "rpk": build_stats_embed,
     "rank": build_stats_embed,
+    "compare": build_compare_embed,
+    "all": build_summary_embed,
 }
+
+
+class EmbedCache:
+    """Embeds already built for a page, so asking for the same view of an
+    entity again before the Herald updates it skips rebuilding the embed.
+
+    Entries are keyed by (url, view, the page's "Last Updated") and dropped
+    with `evict` when the snapshot they were built from leaves the snapshot
+    cache. Rendering a newer version of a page drops the embeds of the
+    older one. Beyond `maxsize` entries the least recently used goes first.
+
+    Example:
+
+    embed = EMBEDS.render(url, ("rank", "rps", "server"), response, build)
+    """
+
+    def __init__(self, maxsize: int = config.EMBED_CACHE_MAX_ENTRIES) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._urls = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(
+        self,
+        url: str,
+        view: Hashable,
+        response: dict,
+        build: Callable[[dict], discord.Embed],
+    ) -> discord.Embed:
+        """Return the embed `build` makes of `response`, building it only
+        if this version of the page hasn't been rendered this way yet.
+
+        Arguments:
+        url :: str
+            The canonical URL the snapshot is cached under.
+        view :: Hashable
+            Everything besides the page that decides the embed, e.g. the
+            table and the comparison of a ?rank command.
+        """
+        updated = response.get("Last Updated")
+        key = (url, view, updated)
+        embed = self._entries.get(key)
+        if embed is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embed
+
+        self.misses += 1
+        for stale in [k for k in self._urls[url] if k[2] != updated]:
+            self._discard(stale)
+
+        embed = build(response)
+        self._entries[key] = embed
+        self._urls[url].add(key)
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+        return embed
+
+    def evict(self, url: str, *_) -> None:
+        """Drop every embed built from `url`. Takes the (key, value) of a
+        snapshot cache eviction listener."""
+        for key in self._urls.pop(url, ()):
+            self._entries.pop(key, None)
+
+    def _discard(self, key: tuple) -> None:
+        self._entries.pop(key, None)
+        keys = self._urls.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._urls[key[0]]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
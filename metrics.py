@@ -0,0 +1,226 @@
+"""
+Latency histograms and counters, exposed in the Prometheus text format on a
+local HTTP endpoint and summarized by the ?botstats command.
+"""
+import bisect
+import contextlib
+import time
+
+from typing import Callable, Dict, Iterator, List, Union
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+REGISTRY = []
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations with a single label.
+
+    Example:
+
+    histogram = Histogram("harold_stage_seconds", "Stage latency.", "stage")
+    with histogram.time("parse"):
+        parse()
+    histogram.quantile("parse", 0.99)
+    """
+
+    def __init__(
+        self, name: str, help: str, label: str, buckets=DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.counts: Dict[str, List[int]] = {}
+        self.sums: Dict[str, float] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: str, seconds: float) -> None:
+        counts = self.counts.setdefault(value, [0] * len(self.buckets))
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sums[value] = self.sums.get(value, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def time(self, value: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(value, time.perf_counter() - start)
+
+    def count(self, value: str) -> int:
+        return sum(self.counts.get(value, ()))
+
+    def quantile(self, value: str, q: float) -> float:
+        """Estimate the `q` quantile by interpolating inside its bucket."""
+        counts = self.counts.get(value)
+        if not counts:
+            return 0.0
+
+        rank = q * sum(counts)
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def expose(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for value, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{self.label}="{value}",'
+                    f'le="{_format_bound(bound)}"}} {cumulative}'
+                )
+            lines.append(
+                f'{self.name}_sum{{{self.label}="{value}"}} {self.sums[value]}'
+            )
+            lines.append(
+                f'{self.name}_count{{{self.label}="{value}"}} {cumulative}'
+            )
+        return lines
+
+
+class Counter:
+    """Monotonic counter with a single label."""
+
+    def __init__(self, name: str, help: str, label: str) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[str, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, value: str, amount: float = 1) -> None:
+        self.values[value] = self.values.get(value, 0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+        ]
+        for value, total in self.values.items():
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {total}')
+        return lines
+
+
+class Collected:
+    """A counter or gauge whose values are read from `collect` at exposition
+    time, e.g. the hit counters a cache already keeps.
+
+    Example:
+
+    Collected("harold_cache", "Snapshot cache.", "gauge", "stat", CACHE.stats)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        label: str,
+        collect: Callable[[], Dict[str, Union[int, float]]],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self.collect = collect
+        REGISTRY.append(self)
+
+    def expose(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for value, total in self.collect().items():
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {total}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "harold_stage_seconds",
+    "Time spent in each stage of a command.",
+    "stage",
+)
+COMMAND_SECONDS = Histogram(
+    "harold_command_seconds",
+    "End to end time of each command.",
+    "command",
+)
+ERRORS = Counter("harold_errors_total", "Errors by kind.", "kind")
+NAMES = Counter(
+    "harold_name_resolution_total", "Typo corrections and suggestions.", "outcome"
+)
+REVALIDATIONS = Counter(
+    "harold_revalidations_total",
+    "Refetches of pages we held a copy of, by outcome.",
+    "outcome",
+)
+
+STAGES = ("fetch", "parse", "project", "embed", "send")
+
+
+def timer(stage: str):
+    """Time a block as one of `STAGES`."""
+    return STAGE_SECONDS.time(stage)
+
+
+def expose() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=expose(), content_type="text/plain")
+
+
+async def serve(host: str, port: int) -> web.AppRunner:
+    """Serve `expose()` at http://`host`:`port`/metrics. Raises OSError when
+    the port can't be bound."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError:
+        await runner.cleanup()
+        raise
+    return runner
@@ -2,14 +2,182 @@
 Callable classes that are responsible for parsing the herald. The design
 was inspired by an article detailing a strict enforcement of the SRP.
 """
+import abc
+import asyncio
+import calendar
+import hashlib
+import logging
+import re
+import time
+
+import aiohttp
+import cache
 import config
+import limiter
+import metrics
+import workers
+
+from array import array
+from concurrent.futures.process import BrokenProcessPool
+from lxml import etree, html
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote, unquote, urlsplit
+
+
+class HeraldResponse:
+    """The parts of an HTTP response the models care about. The body is read
+    eagerly so the connection goes straight back to the pool."""
 
-import requests
-import mypy
-
-from lxml.html.soupparser import fromstring
-from typing import Callable, Union
-from urllib.parse import quote
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        content: bytes,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+
+logger = logging.getLogger("harold.models")
+
+CACHE = cache.TTLCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL)
+# Entity URLs the Herald redirected away from, i.e. unknown names.
+MISSING = cache.TTLCache(config.MISSING_MAX_ENTRIES, config.MISSING_TTL)
+# The validators of every page we've parsed, see `PageVersion`.
+VERSIONS = cache.TTLCache(config.REVALIDATE_MAX_ENTRIES, config.REVALIDATE_TTL)
+LIMITER = limiter.AdaptiveLimiter()
+PARSE_POOL = workers.WorkerPool()
+
+# A shared.SharedSnapshots when the bot runs as several shard processes, so
+# that each page is fetched and parsed by only one of them.
+SHARED = None
+
+metrics.Collected(
+    "harold_cache", "Snapshot cache counters.", "gauge", "stat", CACHE.stats
+)
+metrics.Collected(
+    "harold_negative_cache",
+    "Unknown entity cache counters.",
+    "gauge",
+    "stat",
+    MISSING.stats,
+)
+metrics.Collected(
+    "harold_parse_pool",
+    "Pages waiting for or being parsed by the worker pool.",
+    "gauge",
+    "stat",
+    PARSE_POOL.stats,
+)
+metrics.Collected(
+    "harold_herald_limiter",
+    "Outbound Herald concurrency.",
+    "gauge",
+    "stat",
+    LIMITER.stats,
+)
+
+
+def canonical_url(endpoint: str) -> str:
+    """Normalize an entity URL so that differently cased or quoted spellings
+    of the same character or guild share one cache entry.
+
+    Example:
+
+    canonical_url("http://herald.playphoenix.online/c/DEBUG")
+    # 'https://herald.playphoenix.online/c/debug/'
+    """
+    parts = urlsplit(endpoint)
+    path = quote(unquote(parts.path).strip().lower())
+    if not path.endswith("/"):
+        path += "/"
+    return f"https://{parts.netloc.lower()}{path}"
+
+
+def entity_url(entity: str, name: str) -> str:
+    """Build the Herald URL of a character ("c") or guild ("g") page."""
+    return f"http://{quote(f'herald.playphoenix.online/{entity}/{name}/')}"
+
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared keep-alive session, creating it on first use. Must be
+    called from inside the running event loop."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=config.HERALD_POOL_SIZE,
+            keepalive_timeout=config.HERALD_KEEPALIVE,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=config.HERALD_TIMEOUT),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared session and its pooled connections."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch(
+    endpoint: str, headers: Optional[Dict[str, str]] = None
+) -> Union[HeraldResponse, str]:
+    """HTTP GET `endpoint` through the shared connection pool, waiting for a
+    slot from `LIMITER` first.
+
+    Returns a `HeraldResponse`, or an error string when the Herald could not
+    be reached in time.
+
+    Arguments:
+    endpoint :: str
+        The URL
+    headers :: {name: value}
+        Extra request headers, e.g. conditional ones.
+    """
+    await LIMITER.acquire()
+    start = time.monotonic()
+    status = None
+    try:
+        with metrics.timer("fetch"):
+            request = get_session().get(endpoint, headers=headers)
+            async with request as response:
+                content = await response.read()
+                status = response.status
+        return HeraldResponse(
+            str(response.url), status, content, response.headers
+        )
+    except asyncio.TimeoutError:
+        metrics.ERRORS.inc("timeout")
+        return "There is an issue with the Herald (timed out)."
+    except aiohttp.ClientError as error:
+        metrics.ERRORS.inc(error.__class__.__name__)
+        return f"There is an issue with the Herald ({error.__class__.__name__})."
+    finally:
+        LIMITER.release(time.monotonic() - start, status)
 
 
 class PageMetadata:
@@ -31,288 +199,577 @@ class PageMetadata:
     xpath_base_table = "/html/body/main/div[2]/div[{div}]/table[{table}]/"
     xpath_last_updated = "/html/body/aside/text()"
     character_description = "/html/body/main/div[1]/div"
+    # Guild pages list their members below the statistics. Not checked
+    # against a recorded page yet, see config.ROSTER_ENABLED.
+    xpath_roster = "/html/body/main/div[3]//a[contains(@href, '/c/')]"
+    periods = tuple(xpath_time_period_map.values())
 
 
-class GetAmounts(PageMetadata):
-    def __init__(
-        self, callback: Union[None, Callable[[dict], dict]] = None
-    ) -> None:
-        self.response_structure = {
-            "All Time": {},
-            "This Week": {},
-            "Last Week": {},
-            "Last 48 Hours": {},
-            "Last Updated": "",
-            "Description": "",
-            "URL": "",
-        }
-        self.callback = callback
+class Snapshot:
+    """Everything the Herald shows on one character or guild page, extracted
+    in a single pass. The models and callbacks are projections of a snapshot.
 
-    def __call__(self, endpoint: str) -> Union[dict, str]:
-        """HTTP GET `endpoint` and extract statistics realm points,
-        deaths, deathblows, kills and solo kills from table.
+    Statistics are stored in flat integer arrays rather than nested dicts:
 
-        Arguments:
-        endpoint :: str 
-            The URL
-        
-        Example:
-        
-        realm_kills = models.GetRealmKills('https://herald.playphoenix.online/c/Debug')
-        """
-        response = requests.get(endpoint)
-        if response.url == config.FAILED_RESPONSE_REDIRECT:
-            return False
-
-        print(response.url)
-
-        if response.ok:
-            soup = fromstring(response.text)
-            for metric, xpath in self.xpath_table_map.items():
-                if metric == "Realm Kills":
-                    continue
-                div, table = xpath
-                stats_column = (
-                    f"{self.xpath_base_table.format(div=div, table=table)}"
-                )
-                for row in range(1, 5):
-                    element = soup.xpath(
-                        f"{stats_column}/tbody/tr[{row}]/td[2]"
-                    )
-                    insert = self.response_structure.get(
-                        self.xpath_time_period_map.get(row)
-                    )
-                    insert.update(
-                        {
-                            metric: int(
-                                element[0].text_content().replace(",", "")
-                            )
-                        }
-                    )
-            last_updated = soup.xpath(self.xpath_last_updated)
+    amounts :: metric x period
+    ranks :: metric x period x rank column ("# Server", "# Realm", ...)
+    realm_kills :: period x realm column ("Alb Kills", ...)
 
-            # The character description feels too procedural. There's a better
-            # way to do this with an isolated function.
-            chracter_data = soup.xpath(self.character_description)
-            character_description = " ".join(
-                chracter_data[0].text_content().split()
-            )
-            character_description = character_description.replace("> ", " - ")
-            character_description = character_description.replace(" <", " - ")
+    Example:
 
-            self.response_structure.update(
-                {
-                    "Last Updated": " ".join(
-                        " ".join(last_updated).replace("\n", "").split()
-                    )
-                    + " (UTC)",
-                    "Description": character_description,
-                    "URL": endpoint,
-                }
-            )
-        else:
-            return (
-                f"There is an issue with the Herald ({response.status_code})."
-            )
-        if self.callback:
-            return self.callback(self.response_structure)
+    snapshot.amount("Realm Points", "This Week")
+    snapshot.rank("Kills", "All Time", "# Server")
+    snapshot.realm_kill("Hib Kills", "Last 48 Hours")
+    """
 
-        return self.response_structure
+    __slots__ = (
+        "url",
+        "description",
+        "last_updated",
+        "rank_columns",
+        "realm_columns",
+        "amounts",
+        "ranks",
+        "realm_kills",
+    )
 
+    METRICS = ("Realm Points", "Deathblows", "Deaths", "Kills", "Solo Kills")
+    PERIODS = PageMetadata.periods
+    _METRIC_INDEX = {metric: index for index, metric in enumerate(METRICS)}
+    _PERIOD_INDEX = {period: index for index, period in enumerate(PERIODS)}
 
-class GetRealmKills(PageMetadata):
     def __init__(
-        self, callback: Union[None, Callable[[dict], dict]] = None
+        self,
+        url: str,
+        description: str,
+        last_updated: str,
+        rank_columns: Tuple[str, ...],
+        realm_columns: Tuple[str, ...],
+        amounts: array,
+        ranks: array,
+        realm_kills: array,
     ) -> None:
-        self.response_structure = {
-            "All Time": {},
-            "This Week": {},
-            "Last Week": {},
-            "Last 48 Hours": {},
-            "Last Updated": "",
-            "Description": "",
-            "URL": "",
-        }
-        self.callback = callback
-
-    def __call__(self, endpoint: str) -> Union[dict, str]:
-        """HTTP GET `endpoint` and extract amount of realm 
-        kills from table.
+        self.url = url
+        self.description = description
+        self.last_updated = last_updated
+        self.rank_columns = rank_columns
+        self.realm_columns = realm_columns
+        self.amounts = amounts
+        self.ranks = ranks
+        self.realm_kills = realm_kills
+
+    @classmethod
+    def from_tables(
+        cls,
+        url: str,
+        tables: Dict[str, Tuple[List[str], List[List[int]]]],
+        description: str,
+        last_updated: str,
+    ) -> "Snapshot":
+        """Pack parsed tables into a snapshot.
 
         Arguments:
-        endpoint :: str 
-            The URL
-        
-        Example:
-        
-        realm_kills = models.GetRealmKills('https://herald.playphoenix.online/c/Debug')
+        tables :: {metric: (headers, rows)}
+            One entry per `PageMetadata.xpath_table_map` table. Each row
+            holds the integer cells after the period label, one row per
+            period.
         """
-        response = requests.get(endpoint)
-        if response.url == config.FAILED_RESPONSE_REDIRECT:
-            return False
-
-        if response.ok:
-            soup = fromstring(response.text)
-            for metric, xpath in self.xpath_table_map.items():
-                if metric == "Realm Kills":
-                    div, table = xpath
-                    stats_column = (
-                        f"{self.xpath_base_table.format(div=div, table=table)}"
-                    )
-                    column_range = (
-                        range(2, 4) if "/g/" in endpoint else range(2, 5)
-                    )
-                    for column in column_range:
-                        dimension_elements = soup.xpath(
-                            f"{stats_column}/thead/tr/th[{column}]"
-                        )
-                        measurement = dimension_elements[0].text_content()
-                        for row in range(1, 5):
-                            element = soup.xpath(
-                                f"{stats_column}/tbody/tr[{row}]/td[{column}]"
-                            )
-                            insert = self.response_structure.get(
-                                self.xpath_time_period_map.get(row)
-                            )
-                            insert.update(
-                                {
-                                    measurement: int(
-                                        element[0]
-                                        .text_content()
-                                        .replace(",", "")
-                                    )
-                                }
-                            )
-            last_updated = soup.xpath(self.xpath_last_updated)
-
-            # The character description feels too procedural. There's a better
-            # way to do this with an isolated function.
-            chracter_data = soup.xpath(self.character_description)
-            character_description = " ".join(
-                chracter_data[0].text_content().split()
-            )
-            character_description = character_description.replace("> ", " - ")
-            character_description = character_description.replace(" <", " - ")
+        headers, _ = tables[cls.METRICS[0]]
+        rank_columns = tuple(headers[2:])
+        realm_headers, realm_rows = tables["Realm Kills"]
+        realm_columns = tuple(realm_headers[1:])
+
+        amounts = array("q")
+        ranks = array("q")
+        for metric in cls.METRICS:
+            _, rows = tables[metric]
+            for row in rows:
+                amounts.append(row[0])
+                ranks.extend(row[1 : 1 + len(rank_columns)])
+        realm_kills = array("q")
+        for row in realm_rows:
+            realm_kills.extend(row[: len(realm_columns)])
+
+        return cls(
+            url,
+            description,
+            last_updated,
+            rank_columns,
+            realm_columns,
+            amounts,
+            ranks,
+            realm_kills,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in self.__slots__
+        )
+
+    @property
+    def updated_at(self) -> Optional[float]:
+        """The Herald's "Last Updated" time as a UNIX timestamp."""
+        return parse_last_updated(self.last_updated)
+
+    def amount(self, metric: str, period: str) -> int:
+        index = self._METRIC_INDEX[metric] * len(self.PERIODS)
+        return self.amounts[index + self._PERIOD_INDEX[period]]
+
+    def rank(self, metric: str, period: str, column: str) -> Optional[int]:
+        """The rank in `column`, or None when the page has no such column
+        (guilds have no "# Class" rank)."""
+        if column not in self.rank_columns:
+            return None
+        row = self._METRIC_INDEX[metric] * len(self.PERIODS)
+        row += self._PERIOD_INDEX[period]
+        index = row * len(self.rank_columns) + self.rank_columns.index(column)
+        return self.ranks[index]
+
+    def realm_kill(self, column: str, period: str) -> int:
+        """Kills in the realm `column`. Pages leave out the entity's own
+        realm, where nobody can be killed, so a missing column is 0."""
+        if column not in self.realm_columns:
+            return 0
+        index = self._PERIOD_INDEX[period] * len(self.realm_columns)
+        return self.realm_kills[index + self.realm_columns.index(column)]
+
+    def header(self) -> dict:
+        """The page metadata every response carries."""
+        return {
+            "Last Updated": self.last_updated,
+            "Description": self.description,
+            "URL": self.url,
+        }
 
-            self.response_structure.update(
-                {
-                    "Last Updated": " ".join(
-                        " ".join(last_updated).replace("\n", "").split()
-                    )
-                    + " (UTC)",
-                    "Description": character_description,
-                    "URL": endpoint,
+    def amounts_view(self) -> dict:
+        response_structure = {
+            period: {metric: self.amount(metric, period) for metric in self.METRICS}
+            for period in self.PERIODS
+        }
+        response_structure.update(self.header())
+        return response_structure
+
+    def ranks_view(self) -> dict:
+        response_structure = {
+            period: {
+                metric: {
+                    column: self.rank(metric, period, column)
+                    for column in self.rank_columns
                 }
+                for metric in self.METRICS
+            }
+            for period in self.PERIODS
+        }
+        response_structure.update(self.header())
+        return response_structure
+
+    def realm_kills_view(self) -> dict:
+        response_structure = {
+            period: {
+                column: self.realm_kill(column, period)
+                for column in self.realm_columns
+            }
+            for period in self.PERIODS
+        }
+        response_structure.update(self.header())
+        return response_structure
+
+
+_LAST_UPDATED_PATTERN = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}(?::\d{2})?)"
+)
+
+
+def parse_last_updated(last_updated: str) -> Optional[float]:
+    """Parse the UTC timestamp out of the Herald's "Last Updated" text. The
+    format is the one the synthetic benchmark pages use and hasn't been
+    checked against a live page. Any other text gives None, and then the
+    prefetcher keeps its default interval and history records fetch times.
+
+    Example:
+
+    parse_last_updated("Last Updated: 2019-04-01 12:00 (UTC)")
+    # 1554120000.0
+    """
+    match = _LAST_UPDATED_PATTERN.search(last_updated)
+    if not match:
+        return None
+
+    date, clock = match.groups()
+    if clock.count(":") == 1:
+        clock += ":00"
+    parsed = time.strptime(f"{date} {clock}", "%Y-%m-%d %H:%M:%S")
+    return float(calendar.timegm(parsed))
+
+
+# Compiled once at import; evaluating a compiled XPath skips re-parsing the
+# expression on every page.
+_TABLES = {
+    metric: etree.XPath(
+        PageMetadata.xpath_base_table.format(div=div, table=table).rstrip("/")
+    )
+    for metric, (div, table) in PageMetadata.xpath_table_map.items()
+}
+_HEADERS = etree.XPath("thead/tr/th")
+_ROWS = etree.XPath("tbody/tr")
+_DESCRIPTION = etree.XPath(PageMetadata.character_description)
+_LAST_UPDATED = etree.XPath(PageMetadata.xpath_last_updated)
+_ROSTER = etree.XPath(PageMetadata.xpath_roster)
+
+
+def _to_int(element) -> int:
+    return int(element.text_content().replace(",", ""))
+
+
+def _extract_description(soup) -> str:
+    character_data = _DESCRIPTION(soup)
+    character_description = " ".join(character_data[0].text_content().split())
+    character_description = character_description.replace("> ", " - ")
+    return character_description.replace(" <", " - ")
+
+
+def _extract_last_updated(soup) -> str:
+    last_updated = _LAST_UPDATED(soup)
+    return (
+        " ".join(" ".join(last_updated).replace("\n", "").split()) + " (UTC)"
+    )
+
+
+def _extract_members(soup) -> Tuple[str, ...]:
+    names = (link.text_content().strip() for link in _ROSTER(soup))
+    return tuple(name for name in names if name)
+
+
+def _parse_lxml(url: str, content: bytes) -> Snapshot:
+    """Native lxml parse. Each table is read with one query for its headers
+    and one for its rows; cells are walked as children of the row."""
+    soup = html.fromstring(content)
+    tables = {}
+    for metric, table_xpath in _TABLES.items():
+        table = table_xpath(soup)[0]
+        headers = [element.text_content() for element in _HEADERS(table)]
+        rows = [
+            [_to_int(cell) for cell in row.findall("td")[1:]]
+            for row in _ROWS(table)[: len(PageMetadata.periods)]
+        ]
+        tables[metric] = (headers, rows)
+
+    return Snapshot.from_tables(
+        url, tables, _extract_description(soup), _extract_last_updated(soup)
+    )
+
+
+def _parse_soup(url: str, content: bytes) -> Snapshot:
+    """BeautifulSoup backed parse with per-cell XPath lookups. Slower, but
+    more forgiving of badly broken markup."""
+    from lxml.html.soupparser import fromstring
+
+    soup = fromstring(content.decode("utf-8", errors="replace"))
+    tables = {}
+    for metric, xpath in PageMetadata.xpath_table_map.items():
+        div, table = xpath
+        stats_column = PageMetadata.xpath_base_table.format(div=div, table=table)
+        headers = [
+            element.text_content()
+            for element in soup.xpath(f"{stats_column}/thead/tr/th")
+        ]
+        rows = []
+        for row in PageMetadata.xpath_time_period_map:
+            rows.append(
+                [
+                    _to_int(
+                        soup.xpath(
+                            f"{stats_column}/tbody/tr[{row}]/td[{column}]"
+                        )[0]
+                    )
+                    for column in range(2, len(headers) + 1)
+                ]
             )
-        else:
-            return (
-                f"There is an issue with the Herald ({response.status_code})."
+        tables[metric] = (headers, rows)
+
+    return Snapshot.from_tables(
+        url, tables, _extract_description(soup), _extract_last_updated(soup)
+    )
+
+
+PARSER_MAP = {
+    "lxml": _parse_lxml,
+    "soup": _parse_soup,
+}
+
+
+def parse_snapshot(
+    url: str, content: bytes, parser: str = config.HERALD_PARSER
+) -> Snapshot:
+    """Extract amounts, ranks, realm kills, description and last updated
+    from a Herald page in one pass.
+
+    Arguments:
+    url :: str
+        The URL the page was requested from
+    content :: bytes
+        The raw page body
+    parser :: str
+        A key of `PARSER_MAP`
+    """
+    return PARSER_MAP[parser](url, content)
+
+
+def parse_members(content: bytes) -> Tuple[str, ...]:
+    """The names of the characters on a guild page's roster. Read apart from
+    the snapshot, as only ?roster needs them and a large guild's roster
+    outweighs its statistics many times over."""
+    return _extract_members(html.fromstring(content))
+
+
+async def parse_in_pool(url: str, content: bytes) -> Snapshot:
+    """`parse_snapshot` on `PARSE_POOL`, or on the loop when there is none."""
+    return await PARSE_POOL.run(parse_snapshot, url, content)
+
+
+# Fetches currently running, keyed by canonical URL. Concurrent requests
+# for the same entity await the same future instead of fetching again.
+_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+# Called with every freshly parsed snapshot, e.g. to record its history.
+SNAPSHOT_LISTENERS: List[Callable[[Snapshot], None]] = []
+
+# Called with the URL of every entity a user asks for, cached or not.
+QUERY_LISTENERS: List[Callable[[str], None]] = []
+
+
+class PageVersion(NamedTuple):
+    """What we know about the last copy of a page we parsed."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: bytes
+    snapshot: Snapshot
+
+    def headers(self) -> Dict[str, str]:
+        """Conditional request headers for the validators the Herald sent."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _digest(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def _store(
+    key: str,
+    version: PageVersion,
+    known: Optional[PageVersion],
+    share: bool = True,
+    cache: bool = True,
+) -> Snapshot:
+    """Cache `version` of the page at `key`, share it with the other shards
+    unless it came from them, and tell the listeners when its snapshot is
+    new to this process, i.e. differs from the `known` version. With
+    `cache` False only its validators are kept, in `VERSIONS`."""
+    VERSIONS.set(key, version)
+    if cache:
+        CACHE.set(key, version.snapshot)
+    if share and SHARED is not None:
+        SHARED.put(key, version)
+    if known is None or known.digest != version.digest:
+        for listener in SNAPSHOT_LISTENERS:
+            listener(version.snapshot)
+    return version.snapshot
+
+
+async def _load_snapshot(
+    endpoint: str, key: str, shared: bool = True, cache: bool = True
+) -> Union[Snapshot, str, bool]:
+    """Fetch and parse `endpoint`, unless another shard did so within
+    `CACHE_TTL` and `shared` allows using its copy. When we hold an earlier
+    copy the request is conditional, and a 304 or a body with the same hash
+    as that copy brings back its snapshot without parsing again."""
+    known = previous = VERSIONS.get(key)
+    if SHARED is not None:
+        entry = await SHARED.get(key)
+        if entry is not None:
+            fetched_at, version = entry
+            if known and version and known.digest == version.digest:
+                # Keep the snapshot everything here already refers to.
+                version = version._replace(snapshot=known.snapshot)
+            if shared and time.time() - fetched_at < config.CACHE_TTL:
+                if version is None:
+                    MISSING.set(key, True)
+                    return False
+                return _store(key, version, known, share=False, cache=cache)
+            if version is not None:
+                # The shard that fetched the page last has the newest
+                # validators, and the snapshot they belong to.
+                previous = version
+
+    response = await fetch(endpoint, previous.headers() if previous else None)
+    if isinstance(response, str):
+        return response
+    if response.url == config.FAILED_RESPONSE_REDIRECT:
+        metrics.ERRORS.inc("unknown_entity")
+        MISSING.set(key, True)
+        VERSIONS.pop(key)
+        if SHARED is not None:
+            SHARED.put(key, None)
+        return False
+    if response.status_code == 304 and previous:
+        metrics.REVALIDATIONS.inc("not_modified")
+        return _store(key, previous, known, cache=cache)
+    if not response.ok:
+        metrics.ERRORS.inc(f"http_{response.status_code}")
+        return f"There is an issue with the Herald ({response.status_code})."
+
+    digest = _digest(response.content)
+    if previous is not None and previous.digest == digest:
+        metrics.REVALIDATIONS.inc("unchanged")
+        snapshot = previous.snapshot
+    else:
+        if previous:
+            metrics.REVALIDATIONS.inc("changed")
+        logger.debug("Fetched %s", response.url)
+        try:
+            with metrics.timer("parse"):
+                snapshot = await parse_in_pool(endpoint, response.content)
+        except BrokenProcessPool:
+            # The pool has counted it and already retried the page on a
+            # fresh set of workers, which this page killed as well.
+            return "There is an issue reading that Herald page."
+
+    # Stored even when the body is unchanged, in case the Herald has only
+    # now started sending validators.
+    return _store(
+        key,
+        PageVersion(
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            digest,
+            snapshot,
+        ),
+        known,
+        cache=cache,
+    )
+
+
+async def get_snapshot(
+    endpoint: str, refresh: bool = False, fanout: bool = False
+) -> Union[Snapshot, str, bool]:
+    """Return the snapshot of `endpoint` from `CACHE` when it is fresh,
+    otherwise HTTP GET and parse it. Callers asking for an entity that is
+    already being fetched share the result of that fetch.
+
+    Returns False when the Herald redirects away from an unknown entity,
+    or did so within the last `MISSING_TTL` seconds, and an error string
+    when the Herald is unavailable.
+
+    Arguments:
+    endpoint :: str
+        The URL
+    refresh :: bool
+        Skip the cache, and copies shared by other shards, and re-fetch.
+        Used by background jobs, which are not reported to
+        `QUERY_LISTENERS`.
+    fanout :: bool
+        Fetched on behalf of another entity, e.g. a guild's members for
+        ?roster. Not reported to `QUERY_LISTENERS`, and not added to
+        `CACHE`, so that one command can't push out the entities users
+        ask about. `VERSIONS` still keeps it, so asking again revalidates
+        the page instead of parsing it.
+    """
+    key = canonical_url(endpoint)
+    if not refresh:
+        if not fanout:
+            for listener in QUERY_LISTENERS:
+                listener(endpoint)
+
+        snapshot = CACHE.get(key)
+        if snapshot is not None:
+            return snapshot
+
+    if MISSING.get(key):
+        return False
+
+    inflight = _INFLIGHT.get(key)
+    if inflight is None:
+        inflight = asyncio.ensure_future(
+            _load_snapshot(
+                endpoint, key, shared=not refresh, cache=not fanout
             )
-        if self.callback:
-            return self.callback(self.response_structure)
+        )
+        _INFLIGHT[key] = inflight
+        inflight.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
 
-        return self.response_structure
+    # Shielded so that one cancelled command doesn't cancel the fetch for
+    # everyone else waiting on it.
+    return await asyncio.shield(inflight)
 
 
-class GetRanks(PageMetadata):
+class HeraldModel(PageMetadata, metaclass=abc.ABCMeta):
+    """Fetch the snapshot of an entity page and project it through the
+    model's callback, or into the model's part of the page when there is no
+    callback."""
+
     def __init__(
-        self, callback: Union[None, Callable[[dict], dict]] = None
+        self, callback: Union[None, Callable[[Snapshot], dict]] = None
     ) -> None:
-        self.response_structure = {
-            "All Time": {},
-            "This Week": {},
-            "Last Week": {},
-            "Last 48 Hours": {},
-            "Last Updated": "",
-            "Description": "",
-        }
         self.callback = callback
 
-    def __call__(self, endpoint: str) -> Union[dict, str]:
-        """HTTP GET `endpoint` and extract rank statistics for realm points,
-        deaths, deathblows, kills and solo kills from table.
+    async def __call__(self, endpoint: str) -> Union[dict, str, bool]:
+        """HTTP GET `endpoint` (or reuse its cached snapshot) and project it.
 
         Arguments:
-        endpoint :: str 
+        endpoint :: str
             The URL
-        
+
         Example:
-        
-        realm_kills = models.GetRanks('https://herald.playphoenix.online/c/Debug')
+
+        realm_kills = await models.GetRealmKills()('https://herald.playphoenix.online/c/Debug')
         """
-        response = requests.get(endpoint)
-        if response.url == config.FAILED_RESPONSE_REDIRECT:
-            return False
+        snapshot = await get_snapshot(endpoint)
+        if not isinstance(snapshot, Snapshot):
+            return snapshot
 
-        if response.ok:
-            soup = fromstring(response.text)
+        return self.view(snapshot)
 
-            for metric, xpath in self.xpath_table_map.items():
+    def view(self, snapshot: Snapshot) -> dict:
+        with metrics.timer("project"):
+            if self.callback:
+                return self.callback(snapshot)
 
-                if metric == "Realm Kills":
-                    continue
+            return self.project(snapshot)
 
-                div, table = xpath
-                stats_column = (
-                    f"{self.xpath_base_table.format(div=div, table=table)}"
-                )
-                column_range = (
-                    range(3, 5) if "/g/" in endpoint else range(3, 6)
-                )
+    @abc.abstractmethod
+    def project(self, snapshot: Snapshot) -> dict:
+        """The model's part of `snapshot`."""
 
-                for column in column_range:
 
-                    dimension_elements = soup.xpath(
-                        f"{stats_column}/thead/tr/th[{column}]"
-                    )
-                    measurement = dimension_elements[0].text_content()
+class GetAmounts(HeraldModel):
+    """Realm points, deaths, deathblows, kills and solo kills."""
 
-                    for row in range(1, 5):
+    def project(self, snapshot: Snapshot) -> dict:
+        return snapshot.amounts_view()
 
-                        element = soup.xpath(
-                            f"{stats_column}/tbody/tr[{row}]/td[{column}]"
-                        )
-
-                        insert = self.response_structure.get(
-                            self.xpath_time_period_map.get(row)
-                        )
-                        metric_ranking = insert.setdefault(metric, {})
-                        metric_ranking.update(
-                            {
-                                measurement: int(
-                                    element[0].text_content().replace(",", "")
-                                )
-                            }
-                        )
-            last_updated = soup.xpath(self.xpath_last_updated)
-
-            # The character description feels too procedural. There's a better
-            # way to do this with an isolated function.
-            chracter_data = soup.xpath(self.character_description)
-            character_description = " ".join(
-                chracter_data[0].text_content().split()
-            )
-            character_description = character_description.replace("> ", " - ")
-            character_description = character_description.replace(" <", " - ")
 
-            self.response_structure.update(
-                {
-                    "Last Updated": " ".join(
-                        " ".join(last_updated).replace("\n", "").split()
-                    )
-                    + " (UTC)",
-                    "Description": character_description,
-                    "URL": endpoint,
-                }
-            )
-        else:
-            return (
-                f"There is an issue with the Herald ({response.status_code})."
-            )
-        if self.callback:
-            return self.callback(self.response_structure)
+class GetRealmKills(HeraldModel):
+    """Kills broken down by the realm of the victim."""
+
+    def project(self, snapshot: Snapshot) -> dict:
+        return snapshot.realm_kills_view()
+
+
+class GetRanks(HeraldModel):
+    """Server and realm ranks for realm points, deaths, deathblows, kills
+    and solo kills."""
 
-        return self.response_structure
+    def project(self, snapshot: Snapshot) -> dict:
+        return snapshot.ranks_view()
 
 
 MODEL_MAP = {
@@ -322,6 +779,9 @@ MODEL_MAP = {
     "kills": GetAmounts,
     "solos": GetAmounts,
     "irs": GetAmounts,
+    "kd": GetAmounts,
+    "solo%": GetAmounts,
+    "rpk": GetAmounts,
     "realm kills": GetRealmKills,
     "rank": GetRanks,
 }
@@ -0,0 +1,93 @@
+"""
+An index of character and guild names the bot has seen resolve, used to
+catch typos before they cost a Herald request.
+"""
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional
+from urllib.parse import unquote, urlsplit
+
+import config
+
+
+def _trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Trigram index of known names per entity type ("c" or "g").
+
+    `suggest` gathers the names sharing the most trigrams with the query
+    and ranks them by edit similarity. `correction` only fixes the most
+    common typo, two swapped neighbouring letters, because anything looser
+    could shadow a real name the bot hasn't seen yet.
+
+    Example:
+
+    index = NameIndex()
+    index.add("c", "Debug")
+    index.correction("c", "Debgu")  # "Debug"
+    index.suggest("c", "Debugg")  # ["Debug"]
+    """
+
+    def __init__(self, maxsize: int = config.NAMES_MAX) -> None:
+        self.maxsize = maxsize
+        self.names = {"c": {}, "g": {}}
+        self.trigrams = {"c": defaultdict(set), "g": defaultdict(set)}
+
+    def add(self, entity: str, name: str) -> None:
+        key = name.lower()
+        names = self.names[entity]
+        if key in names or len(names) >= self.maxsize:
+            return
+
+        names[key] = name
+        for trigram in _trigrams(key):
+            self.trigrams[entity][trigram].add(key)
+
+    def add_many(self, entity: str, names: Iterable[str]) -> None:
+        for name in names:
+            self.add(entity, name)
+
+    def observe(self, snapshot) -> None:
+        """Learn the name of a page that resolved, from its URL."""
+        path = unquote(urlsplit(snapshot.url).path).strip("/").split("/")
+        if len(path) == 2 and path[0] in self.names:
+            self.add(*path)
+
+    def known(self, entity: str, name: str) -> bool:
+        return name.lower() in self.names[entity]
+
+    def correction(self, entity: str, name: str) -> Optional[str]:
+        """A known name `name` becomes by swapping two neighbouring
+        letters, if there is one."""
+        key = name.lower()
+        names = self.names[entity]
+        for i in range(len(key) - 1):
+            swapped = key[:i] + key[i + 1] + key[i] + key[i + 2 :]
+            if swapped != key and swapped in names:
+                return names[swapped]
+        return None
+
+    def suggest(
+        self, entity: str, name: str, limit: int = config.NAMES_SUGGESTIONS
+    ) -> List[str]:
+        """Known names that look like `name`, best first."""
+        key = name.lower()
+        shared = Counter()
+        for trigram in _trigrams(key):
+            shared.update(self.trigrams[entity].get(trigram, ()))
+
+        scored = sorted(
+            (
+                (SequenceMatcher(None, key, candidate).ratio(), candidate)
+                for candidate, _ in shared.most_common(config.NAMES_CANDIDATES)
+            ),
+            reverse=True,
+        )
+        return [
+            self.names[entity][candidate]
+            for score, candidate in scored[:limit]
+            if score >= config.NAMES_SUGGEST_RATIO
+        ]
@@ -0,0 +1,196 @@
+"""
+Re-fetch the most popular characters and guilds right after the Herald
+refreshes, so the first query after an update is served from the cache.
+"""
+import asyncio
+import heapq
+import statistics
+import time
+
+from collections import Counter, deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import config
+import models
+
+
+class Prefetcher:
+    """Learn the Herald's update cadence and keep hot entities warm.
+
+    `touch` counts user queries per entity and `observe` collects the
+    distinct "Last Updated" times of parsed snapshots. The interval between
+    Herald updates is the median gap between those times. `run` sleeps until
+    shortly after the next expected update and then re-fetches the `top`
+    most queried entities, at most `concurrency` at a time.
+
+    When several processes serve users but one prefetches, the others
+    `report` their counts and `run` merges them in from `take`.
+
+    Example:
+
+    prefetcher = Prefetcher()
+    models.QUERY_LISTENERS.append(prefetcher.touch)
+    models.SNAPSHOT_LISTENERS.append(prefetcher.observe)
+    bot.loop.create_task(prefetcher.run())
+    """
+
+    def __init__(
+        self,
+        top: int = config.PREFETCH_TOP,
+        concurrency: int = config.PREFETCH_CONCURRENCY,
+        delay: float = config.PREFETCH_DELAY,
+        default_interval: float = config.PREFETCH_DEFAULT_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.top = top
+        self.concurrency = concurrency
+        self.delay = delay
+        self.default_interval = default_interval
+        self.clock = clock
+        self.queries = Counter()
+        self.endpoints: Dict[str, str] = {}
+        self.updates = deque(maxlen=config.PREFETCH_UPDATE_HISTORY)
+
+    def touch(self, endpoint: str) -> None:
+        """Count a user query for the entity at `endpoint`."""
+        key = models.canonical_url(endpoint)
+        if key not in self.queries and (
+            len(self.queries) >= config.PREFETCH_TRACKED
+        ):
+            self._forget(config.PREFETCH_TRIM)
+        self.queries[key] += 1
+        self.endpoints[key] = endpoint
+
+    def merge(self, counts: Dict[str, Tuple[str, int]]) -> None:
+        """Add {canonical URL: (endpoint, queries)} counted elsewhere."""
+        for key, (endpoint, count) in counts.items():
+            self.queries[key] += count
+            self.endpoints[key] = endpoint
+        excess = len(self.queries) - config.PREFETCH_TRACKED
+        if excess > 0:
+            self._forget(excess + config.PREFETCH_TRIM)
+
+    def drain(self) -> Dict[str, Tuple[str, int]]:
+        """Hand over the counts in the form `merge` takes, and start over."""
+        counts = {
+            key: (self.endpoints[key], count)
+            for key, count in self.queries.items()
+        }
+        self.queries.clear()
+        self.endpoints.clear()
+        return counts
+
+    def observe(self, snapshot: models.Snapshot) -> None:
+        """Remember when the Herald last updated, as seen on `snapshot`."""
+        updated_at = snapshot.updated_at
+        if updated_at is not None and updated_at not in self.updates:
+            self.updates.append(updated_at)
+
+    def _forget(self, count: int) -> None:
+        # Counters keep insertion order, so entities queried once are found
+        # oldest first. Only when too few of those are left are the lowest
+        # counts dropped.
+        forget = [key for key, n in self.queries.items() if n == 1][:count]
+        if len(forget) < count:
+            once = set(forget)
+            forget += heapq.nsmallest(
+                count - len(forget),
+                (key for key in self.queries if key not in once),
+                key=self.queries.__getitem__,
+            )
+        for key in forget:
+            del self.queries[key]
+            self.endpoints.pop(key, None)
+
+    @property
+    def interval(self) -> float:
+        """Seconds between Herald updates."""
+        updates = sorted(self.updates)
+        gaps = [
+            later - earlier
+            for earlier, later in zip(updates, updates[1:])
+            if later - earlier >= config.PREFETCH_MIN_INTERVAL
+        ]
+        return statistics.median(gaps) if gaps else self.default_interval
+
+    @property
+    def last_update(self) -> Optional[float]:
+        return max(self.updates) if self.updates else None
+
+    def next_update(self) -> float:
+        """The UNIX time of the next expected Herald update."""
+        now = self.clock()
+        last_update = self.last_update
+        if last_update is None:
+            return now + self.default_interval
+
+        interval = self.interval
+        missed = max(0, int((now - last_update) // interval))
+        return last_update + (missed + 1) * interval
+
+    def hot(self) -> List[str]:
+        return [
+            self.endpoints[key] for key, _ in self.queries.most_common(self.top)
+        ]
+
+    async def refresh(self) -> int:
+        """Re-fetch the hot entities. Returns how many were refreshed."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh_one(endpoint):
+            async with semaphore:
+                return await models.get_snapshot(endpoint, refresh=True)
+
+        snapshots = await asyncio.gather(
+            *[refresh_one(endpoint) for endpoint in self.hot()],
+            return_exceptions=True,
+        )
+        return sum(
+            isinstance(snapshot, models.Snapshot) for snapshot in snapshots
+        )
+
+    async def run(
+        self,
+        take: Optional[
+            Callable[[], Awaitable[Dict[str, Tuple[str, int]]]]
+        ] = None,
+    ) -> None:
+        """Refresh hot entities after every Herald update until cancelled.
+        If the Herald hasn't updated yet when we wake up, retry a few times
+        before waiting for the next cycle. `take` returns the counts other
+        processes reported since it was last called."""
+        while True:
+            await asyncio.sleep(
+                max(0, self.next_update() - self.clock()) + self.delay
+            )
+            if take is not None:
+                self.merge(await take())
+            if not self.queries:
+                continue
+
+            previous = self.last_update
+            for _ in range(config.PREFETCH_RETRIES + 1):
+                await self.refresh()
+                if self.last_update != previous or previous is None:
+                    break
+                await asyncio.sleep(self.delay)
+
+            # Halve the counts so popularity follows recent queries.
+            for key in list(self.queries):
+                self.queries[key] //= 2
+                if not self.queries[key]:
+                    del self.queries[key]
+                    self.endpoints.pop(key, None)
+
+    async def report(
+        self,
+        put: Callable[[Dict[str, Tuple[str, int]]], None],
+        interval: float = config.PREFETCH_REPORT_INTERVAL,
+    ) -> None:
+        """Hand the counts to the process that prefetches instead of using
+        them, every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            counts = self.drain()
+            if counts:
+                put(counts)
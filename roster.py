@@ -0,0 +1,114 @@
+"""
+Fan out from a guild's page to the character pages of its members, and
+rank the members against each other.
+"""
+import asyncio
+
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Tuple, Union
+
+import config
+import metrics
+import models
+
+from callbacks import engine
+
+# ?roster time windows, as named by the Herald's tables.
+WINDOW_PERIODS = {
+    "all": "All Time",
+    "week": "This Week",
+    "lastweek": "Last Week",
+    "48h": "Last 48 Hours",
+}
+
+
+async def fetch_roster(endpoint: str) -> Union[Tuple[str, ...], str, bool]:
+    """The names on the roster of the guild page at `endpoint`. The page is
+    fetched again rather than kept with the guild's snapshot, so only
+    ?roster pays for its roster. Returns False and an error string like
+    `models.get_snapshot`.
+
+    Example:
+
+    members = await fetch_roster(models.entity_url("g", "Swipe Right"))
+    """
+    response = await models.fetch(endpoint)
+    if isinstance(response, str):
+        return response
+    if response.url == config.FAILED_RESPONSE_REDIRECT:
+        return False
+    if not response.ok:
+        metrics.ERRORS.inc(f"http_{response.status_code}")
+        return f"There is an issue with the Herald ({response.status_code})."
+
+    try:
+        with metrics.timer("parse"):
+            return await models.PARSE_POOL.run(
+                models.parse_members, response.content
+            )
+    except BrokenProcessPool:
+        return "There is an issue reading that Herald page."
+
+
+async def fetch_members(
+    members: Iterable[str], concurrency: int = config.ROSTER_CONCURRENCY
+) -> Dict[str, models.Snapshot]:
+    """Fetch the character page of every member, at most `concurrency` at a
+    time, and return the snapshots of those that loaded by name. Members
+    already in the snapshot cache cost nothing. The rest neither count as
+    user queries nor go into the cache.
+
+    Example:
+
+    members = await fetch_roster(models.entity_url("g", "Swipe Right"))
+    snapshots = await fetch_members(members)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(name):
+        async with semaphore:
+            return await models.get_snapshot(
+                models.entity_url("c", name), fanout=True
+            )
+
+    members = list(members)
+    snapshots = await asyncio.gather(
+        *[fetch_one(name) for name in members], return_exceptions=True
+    )
+    return {
+        name: snapshot
+        for name, snapshot in zip(members, snapshots)
+        if isinstance(snapshot, models.Snapshot)
+    }
+
+
+def rank(
+    names: List[str], frame: engine.Frame, metric: str, period: str
+) -> List[Tuple[str, int]]:
+    """(name, amount) of every member of `frame`, best first. `names` are
+    the members in the frame's order."""
+    import numpy as np
+
+    column = frame.snapshots[0].PERIODS.index(period)
+    amounts = frame.amount(metric)[:, column]
+    order = np.argsort(-amounts, kind="stable")
+    return [(names[index], amounts[index].item()) for index in order]
+
+
+def aggregate(
+    names: List[str], frame: engine.Frame, period: str
+) -> Dict[str, Tuple[int, str, int]]:
+    """{metric: (guild total, best member, their amount)} for every metric
+    of `PageMetadata.xpath_table_map` but realm kills."""
+    column = frame.snapshots[0].PERIODS.index(period)
+    amounts = frame.amounts[:, :, column]
+    totals = amounts.sum(axis=0).tolist()
+    best = amounts.argmax(axis=0).tolist()
+    return {
+        metric: (
+            totals[index],
+            names[best[index]],
+            amounts[best[index], index].item(),
+        )
+        for index, metric in enumerate(frame.metrics)
+    }
@@ -0,0 +1,55 @@
+"""
+Run Harold as several shard processes, each with its own event loop and
+its own share of the cores, all serving from one shared snapshot cache.
+
+    python shards.py 4
+"""
+import argparse
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import time
+
+HAROLD = pathlib.Path(__file__).resolve().parent / "harold.py"
+
+
+def spawn(shard_id: int, shard_count: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, str(HAROLD)],
+        env=dict(
+            os.environ,
+            HAROLD_SHARD_ID=str(shard_id),
+            HAROLD_SHARD_COUNT=str(shard_count),
+        ),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "shards", type=int, nargs="?", default=os.cpu_count() or 1
+    )
+    args = parser.parse_args()
+
+    shards = [spawn(shard_id, args.shards) for shard_id in range(args.shards)]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Discord hands a shard's guilds to no one else, so when one shard
+    # exits the rest are stopped too, and the supervisor restarts them all.
+    try:
+        while all(shard.poll() is None for shard in shards):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for shard in shards:
+            if shard.poll() is None:
+                shard.terminate()
+        for shard in shards:
+            shard.wait()
+    sys.exit(max(shard.returncode for shard in shards))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Parsed Herald pages shared between the processes of a sharded bot through
+one local SQLite database, so a page fetched by one shard serves them all.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import config
+import leaderboard
+import models
+
+logger = logging.getLogger("harold.shared")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    url TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    digest BLOB,
+    snapshot BLOB
+);
+CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+CREATE TABLE IF NOT EXISTS ladders (
+    entity TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    window TEXT NOT NULL,
+    crawled_at REAL NOT NULL,
+    ladder BLOB NOT NULL,
+    PRIMARY KEY (entity, metric, window)
+);
+CREATE TABLE IF NOT EXISTS queries (
+    url TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+"""
+
+
+class SharedSnapshots:
+    """The last copy any shard fetched of each page: its pickled snapshot,
+    validators and body hash, or no snapshot for an unknown entity. Also the
+    leaderboard ladders shard 0 crawls for the others, and the user queries
+    the others count for shard 0's prefetcher.
+
+    The database runs in WAL mode, so shards read while another writes.
+    Reads and writes go through one worker thread per process, and writes
+    are queued without waiting, so the event loop never waits on the disk.
+    Rows older than `keep` seconds are pruned every `prune_every` writes.
+
+    Example:
+
+    models.SHARED = SharedSnapshots("data/snapshots.db")
+    """
+
+    def __init__(
+        self,
+        path: str,
+        keep: float = config.REVALIDATE_TTL,
+        timeout: float = config.SHARED_CACHE_TIMEOUT,
+        prune_every: int = config.SHARED_CACHE_PRUNE_EVERY,
+    ) -> None:
+        self.path = path
+        self.keep = keep
+        self.timeout = timeout
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shared"
+        )
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=self.timeout, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    async def _submit(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _select(
+        self, key: str
+    ) -> Optional[Tuple[float, Optional[models.PageVersion]]]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT fetched_at, etag, last_modified, digest, snapshot "
+                "FROM snapshots WHERE url = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        fetched_at, etag, last_modified, digest, snapshot = row
+        if snapshot is None:
+            return fetched_at, None
+        return (
+            fetched_at,
+            models.PageVersion(
+                etag, last_modified, digest, pickle.loads(snapshot)
+            ),
+        )
+
+    async def get(
+        self, key: str
+    ) -> Optional[Tuple[float, Optional[models.PageVersion]]]:
+        """(UNIX time it was fetched, its version) of the page at the
+        canonical URL `key`, None when no shard has fetched it. The version
+        is None when the Herald didn't know the entity. Rows that can't be
+        read, e.g. pickled by an older version of `models.Snapshot`, count
+        as missing."""
+        try:
+            entry = await self._submit(self._select, key)
+        except (sqlite3.Error, pickle.UnpicklingError, AttributeError):
+            self.errors += 1
+            logger.exception("Couldn't read %s from the shared cache", key)
+            return None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _write(
+        self,
+        key: str,
+        fetched_at: float,
+        version: Optional[models.PageVersion],
+    ) -> None:
+        if version is None:
+            row = (key, fetched_at, None, None, None, None)
+        else:
+            row = (
+                key,
+                fetched_at,
+                version.etag,
+                version.last_modified,
+                version.digest,
+                pickle.dumps(version.snapshot, pickle.HIGHEST_PROTOCOL),
+            )
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self.writes += 1
+            if self.writes % self.prune_every == 0:
+                connection.execute(
+                    "DELETE FROM snapshots WHERE fetched_at < ?",
+                    (fetched_at - self.keep,),
+                )
+
+    async def _put(self, *args) -> None:
+        try:
+            await self._submit(self._write, *args)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Couldn't write %s to the shared cache", args[0])
+
+    def put(self, key: str, version: Optional[models.PageVersion]) -> None:
+        """Queue `version` of the page at `key` to be shared, or None for an
+        unknown entity. Never blocks."""
+        write = asyncio.ensure_future(self._put(key, time.time(), version))
+        self._pending.add(write)
+        write.add_done_callback(self._pending.discard)
+
+    def _write_ladder(
+        self, key: Tuple[str, str, str], ladder: leaderboard.Ladder
+    ) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ladders VALUES (?, ?, ?, ?, ?)",
+                key
+                + (
+                    ladder.crawled_at,
+                    pickle.dumps(ladder, pickle.HIGHEST_PROTOCOL),
+                ),
+            )
+
+    def put_ladder(
+        self, key: Tuple[str, str, str], ladder: leaderboard.Ladder
+    ) -> None:
+        """Queue the ladder of (entity, metric, window) to be shared. Takes
+        the arguments of a `LeaderboardIndex` listener and never blocks."""
+        write = asyncio.ensure_future(self._put_ladder(key, ladder))
+        self._pending.add(write)
+        write.add_done_callback(self._pending.discard)
+
+    async def _put_ladder(self, key, ladder) -> None:
+        try:
+            await self._submit(self._write_ladder, key, ladder)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Couldn't share the %s ladder", key)
+
+    def _select_ladders(
+        self, since: float
+    ) -> Dict[Tuple[str, str, str], leaderboard.Ladder]:
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT entity, metric, window, ladder FROM ladders "
+                "WHERE crawled_at > ?",
+                (since,),
+            )
+            .fetchall()
+        )
+        return {
+            (entity, metric, window): pickle.loads(ladder)
+            for entity, metric, window, ladder in rows
+        }
+
+    async def ladders(
+        self, since: float
+    ) -> Dict[Tuple[str, str, str], leaderboard.Ladder]:
+        """The ladders crawled after the UNIX time `since`, by key."""
+        try:
+            return await self._submit(self._select_ladders, since)
+        except (sqlite3.Error, pickle.UnpicklingError, AttributeError):
+            self.errors += 1
+            logger.exception("Couldn't read the shared ladders")
+            return {}
+
+    def _write_queries(self, counts: Dict[str, Tuple[str, int]]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT INTO queries VALUES (?, ?, ?) ON CONFLICT (url) "
+                "DO UPDATE SET count = count + excluded.count",
+                [(key, endpoint, n) for key, (endpoint, n) in counts.items()],
+            )
+
+    def put_queries(self, counts: Dict[str, Tuple[str, int]]) -> None:
+        """Queue {canonical URL: (endpoint, queries)} to be added to the
+        counts waiting for shard 0. Never blocks."""
+        write = asyncio.ensure_future(self._put_queries(counts))
+        self._pending.add(write)
+        write.add_done_callback(self._pending.discard)
+
+    async def _put_queries(self, counts) -> None:
+        try:
+            await self._submit(self._write_queries, counts)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Couldn't share %d query counts", len(counts))
+
+    def _take_queries(self) -> Dict[str, Tuple[str, int]]:
+        connection = self._connect()
+        with connection:
+            # Locked from the read on, so no count lands between the two.
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                "SELECT url, endpoint, count FROM queries"
+            ).fetchall()
+            connection.execute("DELETE FROM queries")
+        return {key: (endpoint, n) for key, endpoint, n in rows}
+
+    async def take_queries(self) -> Dict[str, Tuple[str, int]]:
+        """The query counts the other shards shared since the last call, by
+        canonical URL, removed from the database."""
+        try:
+            return await self._submit(self._take_queries)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Couldn't read the shared query counts")
+            return {}
+
+    async def close(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        if self._connection is not None:
+            await self._submit(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
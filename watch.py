@@ -0,0 +1,177 @@
+"""
+Channel subscriptions to characters and guilds, posted to whenever their
+statistics change on the Herald.
+"""
+import asyncio
+import logging
+import time
+
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Set, Tuple
+
+import config
+import models
+
+logger = logging.getLogger("harold.watch")
+
+
+class Watcher:
+    """Poll every watched entity once per `interval` seconds, however many
+    channels watch it, and tell the subscribed channels what changed.
+
+    Changes are found by `observe`, a snapshot listener, so any fetch of a
+    watched entity counts, not only the poller's. Each new snapshot is
+    compared with the last one seen for that entity, and every channel
+    watching a metric whose "All Time" amount moved gets one `notify` call
+    with all of its changes. Subscriptions live in memory.
+
+    Example:
+
+    watcher = Watcher(notify=post_changes)
+    models.SNAPSHOT_LISTENERS.append(watcher.observe)
+    await watcher.watch(models.entity_url("c", "Debug"), "Debug", channel.id)
+    bot.loop.create_task(watcher.run())
+    """
+
+    def __init__(
+        self,
+        notify: Callable[[int, dict], Awaitable[None]],
+        interval: float = config.WATCH_INTERVAL,
+        concurrency: int = config.WATCH_CONCURRENCY,
+        per_channel: int = config.WATCH_MAX_PER_CHANNEL,
+    ) -> None:
+        self.notify = notify
+        self.interval = interval
+        self.concurrency = concurrency
+        self.per_channel = per_channel
+        self.endpoints: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        # canonical url -> {(channel id, metric)}
+        self.subscribers: Dict[str, Set[Tuple[int, str]]] = defaultdict(set)
+        self.snapshots: Dict[str, models.Snapshot] = {}
+
+    def subscriptions(self, channel_id: int) -> List[Tuple[str, str]]:
+        """The (name, metric) pairs `channel_id` watches."""
+        return sorted(
+            (self.names[key], metric)
+            for key, subscribers in self.subscribers.items()
+            for channel, metric in subscribers
+            if channel == channel_id
+        )
+
+    async def watch(
+        self,
+        endpoint: str,
+        name: str,
+        channel_id: int,
+        metrics: Iterable[str] = models.Snapshot.METRICS,
+    ) -> Tuple[int, str]:
+        """Subscribe `channel_id` to `metrics` of the entity at `endpoint`.
+
+        Returns (how many subscriptions were added, error). The entity is
+        fetched first, both to check that it exists and to have something
+        to compare the next snapshot with.
+        """
+        new = {(channel_id, metric) for metric in metrics}
+        key = models.canonical_url(endpoint)
+        new -= self.subscribers.get(key, set())
+        if len(self.subscriptions(channel_id)) + len(new) > self.per_channel:
+            return 0, f"A channel can watch at most {self.per_channel} stats."
+
+        snapshot = await models.get_snapshot(endpoint)
+        if isinstance(snapshot, str):
+            return 0, snapshot
+        if not snapshot:
+            return 0, f"'{name}' isn't on the Herald."
+
+        self.endpoints[key] = endpoint
+        self.names[key] = name
+        self.snapshots.setdefault(key, snapshot)
+        self.subscribers[key] |= new
+        return len(new), ""
+
+    def unwatch(
+        self,
+        endpoint: str,
+        channel_id: int,
+        metrics: Iterable[str] = models.Snapshot.METRICS,
+    ) -> int:
+        """Drop subscriptions of `channel_id`. Returns how many there were."""
+        key = models.canonical_url(endpoint)
+        subscribers = self.subscribers.get(key, set())
+        gone = {(channel_id, metric) for metric in metrics} & subscribers
+        subscribers -= gone
+        if not subscribers:
+            self._forget(key)
+        return len(gone)
+
+    def _forget(self, key: str) -> None:
+        self.subscribers.pop(key, None)
+        self.endpoints.pop(key, None)
+        self.names.pop(key, None)
+        self.snapshots.pop(key, None)
+
+    def observe(self, snapshot: models.Snapshot) -> None:
+        """Compare a freshly parsed snapshot with the last one of the same
+        entity and notify every channel watching a metric that changed."""
+        key = models.canonical_url(snapshot.url)
+        subscribers = self.subscribers.get(key)
+        if not subscribers:
+            return
+
+        previous, self.snapshots[key] = self.snapshots.get(key), snapshot
+        if previous is None or previous.last_updated == snapshot.last_updated:
+            return
+
+        changes = defaultdict(dict)
+        for channel_id, metric in subscribers:
+            before = previous.amount(metric, "All Time")
+            after = snapshot.amount(metric, "All Time")
+            if before != after:
+                changes[channel_id][metric] = (
+                    f"{before:,} → {after:,} ({after - before:+,})"
+                )
+
+        for channel_id, fields in changes.items():
+            response = {metric: fields[metric] for metric in sorted(fields)}
+            response.update(snapshot.header())
+            response.update(
+                {
+                    "Description": self.names[key],
+                    "Embed Description": "Changed since the last update",
+                }
+            )
+            asyncio.ensure_future(self._notify(channel_id, response))
+
+    async def _notify(self, channel_id: int, response: dict) -> None:
+        try:
+            await self.notify(channel_id, response)
+        except Exception:
+            logger.exception("Couldn't notify channel %s", channel_id)
+
+    async def poll(self) -> int:
+        """Re-fetch every watched entity once. Returns how many answered."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll_one(endpoint):
+            async with semaphore:
+                return await models.get_snapshot(endpoint, refresh=True)
+
+        endpoints = list(self.endpoints.values())
+        snapshots = await asyncio.gather(
+            *[poll_one(endpoint) for endpoint in endpoints],
+            return_exceptions=True,
+        )
+        return sum(
+            isinstance(snapshot, models.Snapshot) for snapshot in snapshots
+        )
+
+    async def run(self) -> None:
+        """Poll every `interval` seconds until cancelled."""
+        while True:
+            started = time.monotonic()
+            if self.endpoints:
+                await self.poll()
+            await asyncio.sleep(
+                max(0, self.interval - (time.monotonic() - started))
+            )
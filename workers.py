@@ -0,0 +1,125 @@
+"""
+A bounded pool of worker threads or processes for CPU work that would
+otherwise hold up the event loop, and with it the Discord gateway.
+"""
+import asyncio
+import logging
+
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+import config
+import metrics
+
+logger = logging.getLogger("harold.workers")
+
+EXECUTORS = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+
+class WorkerPool:
+    """Run functions on `workers` threads or processes, with at most
+    `queue_size` calls waiting for or running in the pool. Further callers
+    wait on the event loop until one finishes. With `kind` None everything
+    runs inline, on the loop.
+
+    In a process pool, functions must be importable at module level, and
+    their arguments and results picklable. A process pool that breaks
+    because a worker died is replaced, and each call it broke is run once
+    more on the new one.
+
+    Example:
+
+    pool = WorkerPool("process", workers=4)
+    pool.start()
+    snapshot = await pool.run(models.parse_snapshot, url, content)
+    """
+
+    def __init__(
+        self,
+        kind: Optional[str] = config.PARSE_POOL,
+        workers: int = config.PARSE_WORKERS,
+        queue_size: int = config.PARSE_QUEUE,
+    ) -> None:
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.waiting = 0
+        self._executor = None
+        self._slots = None
+
+    @property
+    def executor(self) -> Executor:
+        # Started on first use, so importing this module spawns nothing.
+        if self._executor is None:
+            self._executor = EXECUTORS[self.kind](max_workers=self.workers)
+        return self._executor
+
+    def start(self) -> None:
+        """Start the workers now rather than on the first call. A process
+        pool forks them from the calling process, so call this before it
+        opens sockets or starts threads of its own."""
+        if self.kind is not None:
+            self.executor.submit(int).result()
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        # Created lazily so that it binds to the bot's running loop.
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.queue_size)
+        return self._slots
+
+    async def run(self, func: Callable, *args):
+        if self.kind is None:
+            return func(*args)
+
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.submitted += 1
+        try:
+            try:
+                return await self._submit(func, *args)
+            except BrokenProcessPool:
+                return await self._submit(func, *args)
+        finally:
+            self.submitted -= 1
+            self.slots.release()
+
+    async def _submit(self, func: Callable, *args):
+        executor = self.executor
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Every call the dead worker broke lands here; only the first
+            # replaces the pool. The new workers fork from the running bot,
+            # which beats parsing nothing until it restarts.
+            if self._executor is executor:
+                metrics.ERRORS.inc("worker_pool_broken")
+                logger.error("A worker process died, restarting the pool")
+                executor.shutdown(wait=False)
+                self._executor = None
+            raise
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self.kind else 0,
+            "submitted": self.submitted,
+            "waiting": self.waiting,
+        }